@@ -0,0 +1,86 @@
+"""
+=========================================================
+Benchmark: points-in-tube queries for all spans.
+
+Compares the brute-force puntos_en_cilindro loop (one full
+cloud scan per tube) with the XY grid index and the batched
+cKDTree query on a synthetic corridor cloud, and checks that
+the three return the same indices.
+
+Usage:
+    python -m benchmarks.bench_capsule --points 5000000 --spans 500
+=========================================================
+"""
+
+import time
+import argparse
+import numpy as np
+from scipy.spatial import cKDTree
+
+from dms.geometry import puntos_en_cilindro
+from dms.spatial import GridIndex, query_segments_kdtree
+
+
+def synthetic_corridor(n_points, n_spans, span_length=40.0, seed=0):
+    """
+    Cloud along a straight line of poles and the 3 tubes of each span.
+    """
+    rng = np.random.default_rng(seed)
+    length = n_spans * span_length
+    pts = np.column_stack([
+        rng.random(n_points) * length,
+        rng.normal(0.0, 15.0, n_points),
+        rng.random(n_points) * 15.0,
+    ])
+    xs = np.arange(n_spans) * span_length
+    p1s, p2s = [], []
+    for i in range(3):
+        z = 10.0 - i * 1.0
+        p1s.append(np.column_stack([xs, np.zeros(n_spans), np.full(n_spans, z)]))
+        p2s.append(np.column_stack([xs + span_length, np.zeros(n_spans), np.full(n_spans, z)]))
+    return pts, np.vstack(p1s), np.vstack(p2s)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tube queries")
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--spans", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=4.0)
+    parser.add_argument("--cell", type=float, default=5.0)
+    args = parser.parse_args()
+
+    pts, p1s, p2s = synthetic_corridor(args.points, args.spans)
+    print(f"📊 {len(pts)} points, {len(p1s)} tubes, radius {args.radius} m")
+
+    brute, t_brute = timed(lambda: [
+        puntos_en_cilindro(pts, a, b, args.radius) for a, b in zip(p1s, p2s)
+    ])
+
+    grid, t_grid_build = timed(lambda: GridIndex(pts, args.cell))
+    by_grid, t_grid = timed(lambda: [
+        grid.query_cylinder(a, b, args.radius) for a, b in zip(p1s, p2s)
+    ])
+
+    tree, t_tree_build = timed(lambda: cKDTree(pts))
+    (indptr, indices), t_tree = timed(
+        lambda: query_segments_kdtree(tree, pts, p1s, p2s, args.radius)
+    )
+    by_tree = [indices[a:b] for a, b in zip(indptr[:-1], indptr[1:])]
+
+    same_grid = all(np.array_equal(a, b) for a, b in zip(brute, by_grid))
+    same_tree = all(np.array_equal(a, b) for a, b in zip(brute, by_tree))
+
+    print(f"{'method':<22}{'build [s]':>12}{'query [s]':>12}{'same result':>14}")
+    print(f"{'puntos_en_cilindro':<22}{0.0:>12.3f}{t_brute:>12.3f}{'-':>14}")
+    print(f"{'grid index':<22}{t_grid_build:>12.3f}{t_grid:>12.3f}{str(same_grid):>14}")
+    print(f"{'cKDTree batch':<22}{t_tree_build:>12.3f}{t_tree:>12.3f}{str(same_tree):>14}")
+
+
+if __name__ == "__main__":
+    main()
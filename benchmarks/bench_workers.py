@@ -0,0 +1,68 @@
+"""
+=========================================================
+Benchmark: scaling of the parallel collision detection.
+
+Runs evaluar_tramos_paralelo with 1..N worker processes on a
+synthetic corridor cloud and compares every run with the
+serial single-pass evaluation (grid candidates).
+
+Usage:
+    python -m benchmarks.bench_workers --points 5000000 --spans 2000 --workers 1 2 4 8
+=========================================================
+"""
+
+import os
+import argparse
+import numpy as np
+
+from dms.spatial import GridIndex
+from dms.collision import Criterios, candidatos_grid, evaluar_fases, evaluar_tramos_paralelo
+from benchmarks.bench_capsule import synthetic_corridor, timed
+
+
+def mismos_resultados(a, b):
+    return all(
+        len(fa) == len(fb) and all(np.array_equal(x[0], y[0]) and x[1] == y[1] for x, y in zip(fa, fb))
+        for fa, fb in zip(a, b)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel collision detection")
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--spans", type=int, default=500)
+    parser.add_argument("--radius", type=float, default=4.0)
+    parser.add_argument("--cell", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    pts, p1s, p2s = synthetic_corridor(args.points, args.spans)
+    # Top tube of each span; the other phases are Z offsets
+    segmentos = list(zip(p1s[:args.spans], p2s[:args.spans]))
+    dz_fases = [0.0, -1.0, -2.0]
+    labels = np.random.default_rng(1).integers(1, 14, len(pts)).astype(np.int32)
+    # Removed classes are filtered out before the stage, as in tube.py
+    keep = labels != 9
+    pts, labels = pts[keep], labels[keep]
+    print(f"📊 {len(pts)} points, {len(segmentos)} spans x {len(dz_fases)} phases")
+
+    grid = GridIndex(pts, args.cell)
+    serie, t_serie = timed(lambda: [
+        evaluar_fases(pts, labels, candidatos_grid(grid, a, b, args.radius),
+                      a, b, args.radius, dz_fases)
+        for a, b in segmentos
+    ])
+
+    print(f"{'workers':<10}{'time [s]':>12}{'speedup':>10}{'same result':>14}")
+    print(f"{'serial':<10}{t_serie:>12.3f}{1.0:>10.2f}{'-':>14}")
+    for w in args.workers:
+        par, t = timed(lambda: evaluar_tramos_paralelo(
+            pts, labels, segmentos, Criterios(args.radius), dz_fases, w, args.cell
+        ))
+        same = mismos_resultados(serie, [r["fases"] for r in par])
+        print(f"{w:<10}{t:>12.3f}{t_serie / t:>10.2f}{str(same):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ import torch
 import json
 import pandas as pd
 
+from common.packed_clusters import has_packed_clusters, read_packed_clusters
+from common.coords import frame_from_config
+
 class ClassifierInterface:
     def __init__(self, config):
         """
@@ -19,6 +22,8 @@ class ClassifierInterface:
         self.output_csv = os.path.join(config["output_dir"], "poles_MT_info_classified.csv")
         # Path to the trained model
         self.model_path = config["model_trained_path"]
+        # Working coordinates for the geometric features (float32 in local mode)
+        self.frame = frame_from_config(config)
 
         # Import default geometric feature extraction method
         geom_module = importlib.import_module("classifier.geometry_methods.default_geom")
@@ -56,32 +61,44 @@ class ClassifierInterface:
             pred_choice = output.data.max(1)[1]
             return pred_choice.item()
 
-    def run_classification(self):
+    def iter_poles(self):
         """
-        Run classification on all PLY files in the input folder
-        and export results as a CSV.
+        Yield the point cloud of each detected pole, either from the
+        packed file written by the extractor or from individual PLYs.
         """
-        if not os.path.exists(self.input_dir):
-            raise FileNotFoundError(f"❌ Folder not found: {self.input_dir}")
+        if has_packed_clusters(self.input_dir):
+            for points in read_packed_clusters(self.input_dir):
+                yield np.array(points)
+            return
 
         # List all .ply files in the folder
         ply_files = [f for f in os.listdir(self.input_dir) if f.endswith(".ply")]
-        if not ply_files:
-            print("⚠️ No .ply files found for classification.")
-            return
+        for fname in sorted(ply_files):
+            path = os.path.join(self.input_dir, fname)
+            pcd = o3d.io.read_point_cloud(path)
+            yield np.asarray(pcd.points)
+
+    def run_classification(self):
+        """
+        Run classification on all detected poles (packed file or PLY files
+        in the input folder) and export results as a CSV.
+        """
+        if not os.path.exists(self.input_dir):
+            raise FileNotFoundError(f"❌ Folder not found: {self.input_dir}")
 
         poles_info = []
+        found = False
 
-        # Process each pole file
-        for idx, fname in enumerate(sorted(ply_files)):
-            path = os.path.join(self.input_dir, fname)
-            pcd = o3d.io.read_point_cloud(path)
-            points = np.asarray(pcd.points)
+        # Process each pole (loaded one at a time)
+        for idx, points in enumerate(self.iter_poles()):
+            found = True
             if len(points) == 0:
                 continue  # Skip empty point clouds
 
-            # Extract geometric features from the pole
-            geom = self.extract_geometry(points)
+            # Extract geometric features from the pole (offset added back for the CSV)
+            geom = self.extract_geometry(self.frame.to_local(points))
+            center = self.frame.to_global(geom["center"])
+            base_z = float(geom["base_z"]) + self.frame.origin[2]
 
             # Classify pole type
             pole_type = self.classify_pole(points)
@@ -90,13 +107,17 @@ class ClassifierInterface:
             # Store information for CSV
             poles_info.append({
                 "Pole_ID": idx + 1,
-                "Center_X": geom["center"][0],
-                "Center_Y": geom["center"][1],
-                "Base_Z": geom["base_z"],
+                "Center_X": center[0],
+                "Center_Y": center[1],
+                "Base_Z": base_z,
                 "Height_m": geom["height"],
                 "Type": type_str
             })
 
+        if not found:
+            print("⚠️ No .ply files found for classification.")
+            return
+
         # Create output folder if it does not exist
         os.makedirs(os.path.dirname(self.output_csv), exist_ok=True)
         # Save classification results as CSV
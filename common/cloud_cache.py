@@ -0,0 +1,232 @@
+"""
+=========================================================
+Columnar cache of the input cloud:
+One-time conversion of `input_ply` into a directory with one
+.npy file per attribute, points sorted by label and a small
+per-label offsets table. Stages then read only the label
+ranges they need instead of masking the full cloud.
+
+Usage:
+    python -m common.cloud_cache
+=========================================================
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+from common.pointcloud import PointCloud, open_source
+
+CACHE_VERSION = 1
+ORDER_FILE = "_order.npy"       # original index of each cached point
+META_FILE = "meta.json"
+BUILD_CHUNK = 4_000_000         # points gathered per step while building
+SAMPLE_BYTES = 1 << 20          # bytes hashed from the start and end of the source
+
+
+# =========================================================
+# FINGERPRINT
+# =========================================================
+def source_fingerprint(path):
+    """
+    Cheap fingerprint of the source file: size, mtime and the
+    first/last megabyte of its content.
+    """
+    stat = os.stat(path)
+    h = hashlib.sha1()
+    h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        h.update(f.read(SAMPLE_BYTES))
+        if stat.st_size > SAMPLE_BYTES:
+            f.seek(max(stat.st_size - SAMPLE_BYTES, SAMPLE_BYTES))
+            h.update(f.read(SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+def cache_path_for(source_path, cache_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, stem)
+
+
+# =========================================================
+# CACHED CLOUD
+# =========================================================
+class CachedCloud(PointCloud):
+    """
+    Point cloud backed by a columnar cache directory.
+    Columns are memory-mapped .npy files sorted by label.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.path = self.meta["source"]
+        self.field_names = tuple(self.meta["fields"])
+        self.label_field = self.meta["label_field"]
+        # label -> (start, stop) in the sorted columns
+        self.offsets = {int(k): tuple(v) for k, v in self.meta["offsets"].items()}
+        self._columns = {}
+        self._xyz = None
+        self._colors = None
+
+    def __len__(self):
+        return self.meta["num_points"]
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.load(
+                os.path.join(self.directory, f"{name}.npy"), mmap_mode="r"
+            )
+        return self._columns[name]
+
+    @property
+    def original_index(self):
+        """
+        Index of each cached point in the source file.
+        """
+        return np.load(os.path.join(self.directory, ORDER_FILE), mmap_mode="r")
+
+    def label_ranges(self, include=None, exclude=None):
+        """
+        Contiguous (start, stop) ranges of the labels passing the filter.
+        """
+        ranges = []
+        for label, (start, stop) in sorted(self.offsets.items(), key=lambda kv: kv[1]):
+            if include is not None and label not in include:
+                continue
+            if exclude is not None and label in exclude:
+                continue
+            # Merge adjacent ranges to keep reads sequential
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+    def gather(self, name, ranges):
+        col = self.column(name)
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return np.asarray(col[start:stop])
+        if not ranges:
+            return np.zeros(0, dtype=col.dtype)
+        return np.concatenate([col[start:stop] for start, stop in ranges])
+
+    def select(self, include=None, exclude=None, with_colors=False, frame=None):
+        if self.label_field is None or (include is None and exclude is None):
+            return super().select(include, exclude, with_colors, frame)
+
+        include = None if include is None else {int(v) for v in include}
+        exclude = None if exclude is None else {int(v) for v in exclude}
+        ranges = self.label_ranges(include, exclude)
+
+        cols = [self.gather(c, ranges) for c in ("x", "y", "z")]
+        if frame is None:
+            points = np.column_stack(cols).astype(np.float64, copy=False)
+        else:
+            points = np.column_stack(
+                [frame.column_to_local(c, axis) for axis, c in enumerate(cols)]
+            )
+        labels = self.gather(self.label_field, ranges)
+        if not with_colors:
+            return points, labels
+
+        colors = None
+        if self.has_colors:
+            rgb = np.column_stack([self.gather(c, ranges) for c in ("red", "green", "blue")])
+            colors = self.normalize_colors(rgb)
+        return points, labels, colors
+
+
+# =========================================================
+# BUILD / OPEN
+# =========================================================
+def build_cache(cloud, directory, fingerprint):
+    """
+    Writes the columnar cache of `cloud` into `directory`.
+    """
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    n = len(cloud)
+    labels = cloud.labels
+    offsets = {}
+    if labels is not None:
+        labels = np.asarray(labels)
+        order = np.argsort(labels, kind="stable")
+        sorted_labels = labels[order]
+        values, starts = np.unique(sorted_labels, return_index=True)
+        stops = np.append(starts[1:], n)
+        offsets = {str(int(v)): [int(a), int(b)] for v, a, b in zip(values, starts, stops)}
+        del sorted_labels
+    else:
+        order = np.arange(n)
+
+    np.save(os.path.join(tmp_dir, ORDER_FILE), order)
+
+    # One column at a time, in bounded chunks
+    for name in cloud.field_names:
+        src = cloud.column(name)
+        out = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, f"{name}.npy"), mode="w+",
+            dtype=src.dtype.newbyteorder("="), shape=(n,)
+        )
+        for start in range(0, n, BUILD_CHUNK):
+            idx = order[start:start + BUILD_CHUNK]
+            out[start:start + len(idx)] = src[idx]
+        out.flush()
+        del out
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": cloud.path,
+        "fingerprint": fingerprint,
+        "num_points": n,
+        "fields": list(cloud.field_names),
+        "label_field": cloud.label_field,
+        "offsets": offsets,
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=4)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def is_valid_cache(directory, fingerprint):
+    meta_path = os.path.join(directory, META_FILE)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    return meta.get("version") == CACHE_VERSION and meta.get("fingerprint") == fingerprint
+
+
+def open_cache(source_path, cache_dir, cloud=None):
+    """
+    Opens the cache of `source_path`, (re)building it when missing or stale.
+    """
+    source_path = os.path.abspath(source_path)
+    directory = cache_path_for(source_path, cache_dir)
+    fingerprint = source_fingerprint(source_path)
+    if not is_valid_cache(directory, fingerprint):
+        if cloud is None:
+            cloud = open_source(source_path)
+        print(f"🗂️ Building columnar cache: {directory}")
+        os.makedirs(cache_dir, exist_ok=True)
+        build_cache(cloud, directory, fingerprint)
+    return CachedCloud(directory)
+
+
+# =========================================================
+# EXECUTE
+# =========================================================
+if __name__ == "__main__":
+    with open("config.json", "r") as f:
+        config = json.load(f)
+    cached = open_cache(config["input_ply"], config.get("cache_dir", "output/cache"))
+    print(f"✅ Cache ready: {cached.directory} ({len(cached)} points)")
@@ -0,0 +1,24 @@
+"""
+=========================================================
+Cluster labels:
+Helpers shared by the clustering code (voxel components and
+the extractor methods) to keep label numbering consistent.
+=========================================================
+"""
+
+import numpy as np
+
+
+def renumber_labels(comp):
+    """
+    Cluster ids 0..K-1 in order of first appearance (-1 stays noise),
+    so labels do not depend on how a method enumerates its clusters.
+    """
+    comp = np.asarray(comp)
+    kept = comp >= 0
+    uniq, first_pt = np.unique(comp[kept], return_index=True)
+    rank = np.empty(len(uniq), dtype=np.int64)
+    rank[np.argsort(first_pt)] = np.arange(len(uniq))
+    labels = np.full(len(comp), -1, dtype=np.int64)
+    labels[kept] = rank[np.searchsorted(uniq, comp[kept])]
+    return labels
@@ -0,0 +1,139 @@
+"""
+=========================================================
+Coordinate frame:
+UTM clouds lose precision in float32, so the "local" mode
+subtracts a per-dataset origin once at load time and keeps
+points as float32. The origin is added back only when CSV,
+JSON and PLY outputs are written.
+
+The origin is the bounding box center of `input_ply`, so every
+stage derives the same one. It is saved with the fingerprint of
+the input in `<output_dir>/coordinate_frame.json`; a saved frame
+is only reused when the fingerprint matches.
+=========================================================
+"""
+
+import os
+import json
+import numpy as np
+
+from common.pointcloud import load_pointcloud
+from common.cloud_cache import source_fingerprint
+
+FRAME_FILE = "coordinate_frame.json"
+
+
+class CoordinateFrame:
+    """
+    Maps global (UTM) coordinates to the working coordinates and back.
+    """
+
+    def __init__(self, origin=None, dtype=np.float64):
+        self.origin = np.zeros(3) if origin is None else np.asarray(origin, dtype=np.float64)
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def is_local(self):
+        return self.dtype != np.float64 or bool(np.any(self.origin))
+
+    def column_to_local(self, values, axis):
+        """
+        One coordinate column (axis 0=x, 1=y, 2=z) in working coordinates.
+        """
+        if not self.is_local:
+            return np.asarray(values, dtype=np.float64)
+        return (values - self.origin[axis]).astype(self.dtype)
+
+    def to_local(self, points):
+        """
+        (N,D) or (D,) global coordinates -> working coordinates (D = 2 or 3).
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if not self.is_local:
+            return points
+        d = points.shape[-1]
+        return (points - self.origin[:d]).astype(self.dtype)
+
+    def to_global(self, points):
+        """
+        Working coordinates -> (N,D) or (D,) float64 global coordinates.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if not self.is_local:
+            return points
+        d = points.shape[-1]
+        return points + self.origin[:d]
+
+    @property
+    def ply_coord_dtype(self):
+        # Global UTM coordinates need doubles once the offset is added back
+        return "f8" if self.is_local else "f4"
+
+
+def bbox_center(mins, maxs):
+    """
+    Center of a bounding box, rounded to the metre and padded to 3D.
+    """
+    center = np.round((np.asarray(mins, dtype=np.float64) + np.asarray(maxs)) / 2.0)
+    return np.concatenate([center, np.zeros(3 - len(center))])
+
+
+def cloud_center(cloud):
+    """
+    Center of the cloud bounding box (LAS header bounds when available).
+    """
+    if getattr(cloud, "_center", None) is None:
+        header = getattr(cloud, "header", None)
+        if header is not None and np.any(header.get("maxs", 0) != header.get("mins", 0)):
+            cloud._center = bbox_center(header["mins"], header["maxs"])
+        else:
+            cols = [cloud.x, cloud.y, cloud.z]
+            cloud._center = bbox_center([np.min(c) for c in cols], [np.max(c) for c in cols])
+    return cloud._center
+
+
+def frame_from_config(config, cloud=None):
+    """
+    Builds the coordinate frame of this run.
+
+    config["coordinates"]:
+        mode: "global" (float64, default) or "local" (float32, origin-shifted)
+        origin: optional fixed [x, y, z]. Otherwise it is the bounding box
+                center of config["input_ply"] (`cloud`, when the stage has
+                already loaded it), identical in every stage.
+    """
+    coords_cfg = config.get("coordinates", {})
+    if coords_cfg.get("mode", "global") != "local":
+        return CoordinateFrame()
+
+    origin = coords_cfg.get("origin")
+    if origin is not None:
+        return CoordinateFrame(origin, np.float32)
+
+    input_path = config.get("input_ply")
+    if not input_path or not os.path.exists(input_path):
+        raise FileNotFoundError(
+            f"❌ Local coordinates need input_ply to derive the origin: {input_path}"
+        )
+    fingerprint = source_fingerprint(input_path)
+
+    # Saved frame of the same input: no need to map the cloud
+    frame_path = os.path.join(config.get("output_dir", "output"), FRAME_FILE)
+    if os.path.exists(frame_path):
+        with open(frame_path, "r") as f:
+            saved = json.load(f)
+        if saved.get("fingerprint") == fingerprint:
+            return CoordinateFrame(saved["origin"], np.float32)
+
+    if cloud is None:
+        cloud = load_pointcloud(input_path, cache_dir=config.get("cache_dir"))
+    origin = [float(v) for v in cloud_center(cloud)]
+
+    os.makedirs(os.path.dirname(frame_path) or ".", exist_ok=True)
+    with open(frame_path, "w") as f:
+        json.dump({
+            "origin": origin,
+            "source": os.path.abspath(input_path),
+            "fingerprint": fingerprint,
+        }, f, indent=4)
+    return CoordinateFrame(origin, np.float32)
@@ -0,0 +1,194 @@
+"""
+=========================================================
+Extract archive:
+All collision extracts of a run in one compact binary file.
+Per extract, coordinates are quantized to int32 steps of
+`scale` metres relative to a per-extract origin, colors and
+labels are uint8. A JSON index at the end of the file holds
+the byte offset of every extract, so the reader maps a
+single extract without touching the others.
+
+Layout:
+    MAGIC | extract 1 | extract 2 | ... | JSON index | FOOTER
+    extract = int32 xyz (N,3) | uint8 rgb (N,3) | uint8 label (N)
+    FOOTER  = index offset (uint64) | index length (uint64) | MAGIC
+
+Usage (export PLYs for viewers):
+    python -m common.extract_archive output/collisions/collision_extracts.dmsx
+=========================================================
+"""
+
+import os
+import json
+import struct
+import argparse
+import numpy as np
+
+from common.ply_writer import write_ply
+
+MAGIC = b"DMSXARC1"
+FOOTER = struct.Struct("<QQ8s")
+ARCHIVE_VERSION = 1
+DEFAULT_SCALE = 0.001  # 1 mm
+ARCHIVE_FILE = "collision_extracts.dmsx"
+
+
+# =========================================================
+# WRITER
+# =========================================================
+class ExtractArchiveWriter:
+    """
+    Appends extracts to an archive; close() writes the index.
+    """
+
+    def __init__(self, path, scale=DEFAULT_SCALE):
+        self.path = path
+        self.scale = float(scale)
+        self.extracts = []
+        self.tmp_path = path + ".tmp"
+        self.f = open(self.tmp_path, "wb")
+        self.f.write(MAGIC)
+
+    def add(self, name, points, colors=None, labels=None):
+        """
+        Quantizes and appends one extract (points in global coordinates,
+        colors in [0,1] or uint8, labels 0-255). Returns the bytes written.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        origin = np.floor(points.min(axis=0)) if n else np.zeros(3)
+        q = np.rint((points - origin) / self.scale)
+        if n and q.max() > np.iinfo(np.int32).max:
+            raise ValueError(f"❌ Extract {name} is too large for scale {self.scale} m")
+
+        if colors is None:
+            rgb = np.zeros((n, 3), dtype=np.uint8)
+        else:
+            colors = np.asarray(colors)
+            rgb = colors if colors.dtype == np.uint8 else np.clip(np.rint(colors * 255.0), 0, 255)
+
+        if labels is None:
+            lbl = np.zeros(n, dtype=np.uint8)
+        else:
+            labels = np.asarray(labels)
+            if n and (labels.min() < 0 or labels.max() > 255):
+                raise ValueError(f"❌ Labels of extract {name} do not fit in uint8")
+            lbl = labels
+
+        offset = self.f.tell()
+        q.astype("<i4").tofile(self.f)
+        np.asarray(rgb, dtype=np.uint8).tofile(self.f)
+        np.asarray(lbl, dtype=np.uint8).tofile(self.f)
+        self.extracts.append({
+            "name": name,
+            "count": int(n),
+            "origin": origin.tolist(),
+            "offset": offset,
+        })
+        return self.f.tell() - offset
+
+    def close(self):
+        if self.f is None:
+            return
+        index = json.dumps({
+            "version": ARCHIVE_VERSION,
+            "scale": self.scale,
+            "extracts": self.extracts,
+        }).encode("utf-8")
+        index_offset = self.f.tell()
+        self.f.write(index)
+        self.f.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        self.f.close()
+        self.f = None
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self.f is not None:
+            self.f.close()
+            self.f = None
+            os.remove(self.tmp_path)
+
+
+# =========================================================
+# READER
+# =========================================================
+class ExtractArchive:
+    """
+    Lazy reader: only the index is read on open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"❌ Not an extract archive: {path}")
+            f.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_len, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"❌ Truncated extract archive: {path}")
+            f.seek(index_offset)
+            index = json.loads(f.read(index_len).decode("utf-8"))
+        self.scale = index["scale"]
+        self.extracts = index["extracts"]
+        self.by_name = {e["name"]: i for i, e in enumerate(self.extracts)}
+
+    def __len__(self):
+        return len(self.extracts)
+
+    @property
+    def names(self):
+        return [e["name"] for e in self.extracts]
+
+    def _entry(self, key):
+        return self.extracts[self.by_name[key] if isinstance(key, str) else key]
+
+    def raw(self, key):
+        """
+        Memory-mapped (int32 xyz, uint8 rgb, uint8 labels) of one extract.
+        """
+        e = self._entry(key)
+        n = e["count"]
+        if n == 0:
+            return np.zeros((0, 3), np.int32), np.zeros((0, 3), np.uint8), np.zeros(0, np.uint8)
+        block = np.memmap(self.path, dtype=np.uint8, mode="r", offset=e["offset"], shape=(n * 16,))
+        xyz = block[:n * 12].view("<i4").reshape(n, 3)
+        rgb = block[n * 12:n * 15].reshape(n, 3)
+        lbl = block[n * 15:]
+        return xyz, rgb, lbl
+
+    def read(self, key):
+        """
+        (points float64 global, colors float [0,1], labels) of one extract.
+        """
+        e = self._entry(key)
+        xyz, rgb, lbl = self.raw(key)
+        points = xyz * self.scale + np.asarray(e["origin"])
+        return points, rgb / 255.0, np.array(lbl, dtype=np.int32)
+
+    def export_ply(self, key, path, colors_uint8=False):
+        points, colors, labels = self.read(key)
+        write_ply(path, points, colors, labels, colors_uint8=colors_uint8, coord_dtype="f8")
+
+
+# =========================================================
+# EXECUTE
+# =========================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export extracts of an archive as PLY")
+    parser.add_argument("archive")
+    parser.add_argument("--out", help="Output directory (default: next to the archive)")
+    parser.add_argument("--names", nargs="+", help="Extracts to export (default: all)")
+    args = parser.parse_args()
+
+    archive = ExtractArchive(args.archive)
+    out_dir = args.out or os.path.dirname(os.path.abspath(args.archive))
+    os.makedirs(out_dir, exist_ok=True)
+    for name in args.names or archive.names:
+        path = os.path.join(out_dir, f"{name}.ply")
+        archive.export_ply(name, path)
+        print(f"[OK] {path}")
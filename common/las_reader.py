@@ -0,0 +1,204 @@
+"""
+=========================================================
+LAS reader:
+Memory-maps the point records of uncompressed LAS 1.2-1.4
+files (point formats 0-10) as a NumPy structured array.
+Scale/offset are applied only when coordinates are touched,
+and the LAS classification is exposed as the label field.
+=========================================================
+"""
+
+import struct
+import numpy as np
+
+from common.pointcloud import PointCloud
+
+# Fields shared by point formats 0-5 (legacy)
+LEGACY_BASE = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"),
+    ("intensity", "<u2"),
+    ("return_bits", "u1"),
+    ("classification", "u1"),
+    ("scan_angle_rank", "i1"),
+    ("user_data", "u1"),
+    ("point_source_id", "<u2"),
+]
+
+# Fields shared by point formats 6-10 (LAS 1.4)
+EXTENDED_BASE = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"),
+    ("intensity", "<u2"),
+    ("return_bits", "u1"),
+    ("class_flags", "u1"),
+    ("classification", "u1"),
+    ("user_data", "u1"),
+    ("scan_angle", "<i2"),
+    ("point_source_id", "<u2"),
+    ("gps_time", "<f8"),
+]
+
+GPS = [("gps_time", "<f8")]
+RGB = [("red", "<u2"), ("green", "<u2"), ("blue", "<u2")]
+NIR = [("nir", "<u2")]
+WAVE = [
+    ("wave_descriptor", "u1"), ("wave_offset", "<u8"), ("wave_size", "<u4"),
+    ("wave_location", "<f4"), ("wave_xt", "<f4"), ("wave_yt", "<f4"), ("wave_zt", "<f4"),
+]
+
+POINT_FORMATS = {
+    0: LEGACY_BASE,
+    1: LEGACY_BASE + GPS,
+    2: LEGACY_BASE + RGB,
+    3: LEGACY_BASE + GPS + RGB,
+    4: LEGACY_BASE + GPS + WAVE,
+    5: LEGACY_BASE + GPS + RGB + WAVE,
+    6: EXTENDED_BASE,
+    7: EXTENDED_BASE + RGB,
+    8: EXTENDED_BASE + RGB + NIR,
+    9: EXTENDED_BASE + WAVE,
+    10: EXTENDED_BASE + RGB + NIR + WAVE,
+}
+
+# Fields exposed to the pipeline (besides x/y/z)
+EXPOSED_FIELDS = ["intensity", "classification", "red", "green", "blue"]
+
+
+def is_las(path):
+    return path.lower().endswith((".las", ".laz"))
+
+
+# =========================================================
+# HEADER
+# =========================================================
+def read_las_header(path):
+    """
+    Parses the LAS public header block.
+    Returns:
+        dict with version, point format, record length, number of
+        points, offset to the point data, scale and offset
+    """
+    with open(path, "rb") as f:
+        raw = f.read(375)
+    if raw[:4] != b"LASF":
+        raise ValueError(f"❌ Not a LAS file: {path}")
+
+    major, minor = raw[24], raw[25]
+    offset_to_points, = struct.unpack_from("<I", raw, 96)
+    point_format, record_length = struct.unpack_from("<BH", raw, 104)
+    num_points, = struct.unpack_from("<I", raw, 107)
+    scale = struct.unpack_from("<3d", raw, 131)
+    offset = struct.unpack_from("<3d", raw, 155)
+    max_x, min_x, max_y, min_y, max_z, min_z = struct.unpack_from("<6d", raw, 179)
+
+    # LAS 1.4 stores the 64-bit point count after the EVLR fields
+    if (major, minor) >= (1, 4):
+        num_points_64, = struct.unpack_from("<Q", raw, 247)
+        num_points = num_points_64 or num_points
+
+    if point_format & 0xC0:
+        raise ValueError(f"❌ Compressed LAZ point records are not supported: {path}")
+    if point_format not in POINT_FORMATS:
+        raise ValueError(f"❌ Unsupported LAS point format {point_format}: {path}")
+
+    return {
+        "version": (major, minor),
+        "point_format": point_format,
+        "record_length": record_length,
+        "num_points": num_points,
+        "data_offset": offset_to_points,
+        "scale": np.array(scale),
+        "offset": np.array(offset),
+        "mins": np.array([min_x, min_y, min_z]),
+        "maxs": np.array([max_x, max_y, max_z]),
+    }
+
+
+def record_dtype(header):
+    """
+    Structured dtype of one point record (extra bytes kept as padding).
+    """
+    fields = list(POINT_FORMATS[header["point_format"]])
+    size = np.dtype(fields).itemsize
+    extra = header["record_length"] - size
+    if extra < 0:
+        raise ValueError("❌ LAS record length shorter than its point format.")
+    if extra:
+        fields.append(("extra_bytes", f"V{extra}"))
+    return np.dtype(fields)
+
+
+def las_classification(records, point_format):
+    """
+    Class code of each record. Formats 0-5 pack flags in the upper 3 bits.
+    """
+    cls = records["classification"]
+    if point_format <= 5:
+        return cls & 0x1F
+    return cls
+
+
+def las_coordinate(records, axis, header):
+    """
+    Scaled coordinate of one axis (0=x, 1=y, 2=z) as float64.
+    """
+    raw = records["XYZ"[axis]]
+    return raw * header["scale"][axis] + header["offset"][axis]
+
+
+def map_las_records(path, header=None):
+    header = header or read_las_header(path)
+    dtype = record_dtype(header)
+    if header["num_points"] == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(
+        path, dtype=dtype, mode="r",
+        offset=header["data_offset"], shape=(header["num_points"],)
+    )
+
+
+def iter_las_chunks(path, chunk_size):
+    """
+    Yields (start_index, records) with at most `chunk_size` records.
+    """
+    header = read_las_header(path)
+    dtype = record_dtype(header)
+    with open(path, "rb") as f:
+        f.seek(header["data_offset"])
+        start = 0
+        while start < header["num_points"]:
+            n = min(chunk_size, header["num_points"] - start)
+            records = np.fromfile(f, dtype=dtype, count=n)
+            if len(records) == 0:
+                break
+            yield start, records
+            start += len(records)
+
+
+# =========================================================
+# POINT CLOUD
+# =========================================================
+class LasPointCloud(PointCloud):
+    """
+    Lazy view over the point records of a LAS file.
+    """
+
+    def __init__(self, path):
+        self.header = read_las_header(path)
+        names = record_dtype(self.header).names
+        super().__init__(map_las_records(path, self.header), path=path)
+        self.field_names = ("x", "y", "z") + tuple(f for f in EXPOSED_FIELDS if f in names)
+        self.label_field = "classification"
+
+    def column(self, name):
+        if name in ("x", "y", "z"):
+            return las_coordinate(self.vertex, "xyz".index(name), self.header)
+        if name == "classification":
+            return las_classification(self.vertex, self.header["point_format"])
+        return self.vertex[name]
+
+    def stack_xyz(self, mask=None, frame=None):
+        records = self.vertex if mask is None else self.vertex[mask]
+        cols = [las_coordinate(records, axis, self.header) for axis in range(3)]
+        if frame is not None:
+            cols = [frame.column_to_local(c, axis) for axis, c in enumerate(cols)]
+        return np.column_stack(cols)
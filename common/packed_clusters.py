@@ -0,0 +1,62 @@
+"""
+=========================================================
+Packed pole clusters:
+All clusters stored as one concatenated points array plus
+an offsets index (cluster i = points[offsets[i]:offsets[i+1]]).
+=========================================================
+"""
+
+import os
+import numpy as np
+
+PACKED_POINTS = "poles_packed_points.npy"
+PACKED_OFFSETS = "poles_packed_offsets.npy"
+
+
+def packed_paths(directory):
+    return (
+        os.path.join(directory, PACKED_POINTS),
+        os.path.join(directory, PACKED_OFFSETS),
+    )
+
+
+def has_packed_clusters(directory):
+    return all(os.path.exists(p) for p in packed_paths(directory))
+
+
+def remove_packed_clusters(directory):
+    for p in packed_paths(directory):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def write_packed_clusters(clusters, directory):
+    """
+    Writes all clusters into the packed form.
+    """
+    os.makedirs(directory, exist_ok=True)
+    sizes = np.array([len(c) for c in clusters], dtype=np.int64)
+    offsets = np.zeros(len(clusters) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    points_path, offsets_path = packed_paths(directory)
+    out = np.lib.format.open_memmap(
+        points_path, mode="w+", dtype=np.float64, shape=(int(offsets[-1]), 3)
+    )
+    for c, start, stop in zip(clusters, offsets[:-1], offsets[1:]):
+        out[start:stop] = c
+    out.flush()
+    del out
+    np.save(offsets_path, offsets)
+    return points_path
+
+
+def read_packed_clusters(directory):
+    """
+    Yields each cluster (Nx3) from the packed form, memory-mapped.
+    """
+    points_path, offsets_path = packed_paths(directory)
+    points = np.load(points_path, mmap_mode="r")
+    offsets = np.load(offsets_path)
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        yield points[start:stop]
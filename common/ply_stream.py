@@ -0,0 +1,91 @@
+"""
+=========================================================
+Streaming PLY reader:
+Reads the vertex element (or LAS point records) in fixed-size
+chunks so peak memory depends on the chunk size and on the
+points that are kept, not on the size of the map.
+=========================================================
+"""
+
+import numpy as np
+
+from common.pointcloud import read_ply_header, vertex_dtype, find_label_field
+from common.las_reader import (
+    is_las, read_las_header, iter_las_chunks, las_classification, las_coordinate
+)
+
+# Default number of vertices read per chunk
+DEFAULT_CHUNK = 4_000_000
+
+
+def iter_ply_chunks(path, chunk_size=DEFAULT_CHUNK):
+    """
+    Yields (start_index, chunk) with `chunk` a structured array of at
+    most `chunk_size` vertices.
+    """
+    header = read_ply_header(path)
+    fmt = header["format"]
+    name, count, properties = header["elements"][0]
+    if name != "vertex":
+        raise ValueError(f"❌ Streaming needs 'vertex' as first element: {path}")
+    dtype = vertex_dtype(properties, fmt)
+    if dtype is None:
+        raise ValueError(f"❌ Streaming does not support list properties: {path}")
+
+    with open(path, "rb") as f:
+        f.seek(header["data_offset"])
+        start = 0
+        while start < count:
+            n = min(chunk_size, count - start)
+            if fmt == "ascii":
+                chunk = np.loadtxt(f, dtype=dtype, max_rows=n, ndmin=1)
+            else:
+                chunk = np.fromfile(f, dtype=dtype, count=n)
+            if len(chunk) == 0:
+                break
+            yield start, chunk
+            start += len(chunk)
+
+
+def read_label_points(path, target_label, chunk_size=DEFAULT_CHUNK, return_indices=False):
+    """
+    Streams the PLY/LAS file and keeps only the points with `target_label`.
+    Returns:
+        points (Nx3 float64), and their original indices if requested
+    """
+    parts, index_parts = [], []
+    label_field = None
+    las_header = read_las_header(path) if is_las(path) else None
+
+    chunks = (
+        iter_las_chunks(path, chunk_size) if las_header
+        else iter_ply_chunks(path, chunk_size)
+    )
+    for start, chunk in chunks:
+        if las_header:
+            keep = np.flatnonzero(
+                las_classification(chunk, las_header["point_format"]) == target_label
+            )
+        else:
+            if label_field is None:
+                label_field = find_label_field(chunk.dtype.names)
+                if label_field is None:
+                    raise ValueError("❌ No label field found in PLY.")
+            keep = np.flatnonzero(chunk[label_field] == target_label)
+        if len(keep) == 0:
+            continue
+
+        sel = chunk[keep]
+        if las_header:
+            xyz = [las_coordinate(sel, axis, las_header) for axis in range(3)]
+        else:
+            xyz = [sel["x"], sel["y"], sel["z"]]
+        parts.append(np.column_stack(xyz).astype(np.float64))
+        if return_indices:
+            index_parts.append(keep + start)
+
+    points = np.concatenate(parts) if parts else np.zeros((0, 3))
+    if not return_indices:
+        return points
+    indices = np.concatenate(index_parts) if index_parts else np.zeros(0, dtype=np.int64)
+    return points, indices
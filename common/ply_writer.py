@@ -0,0 +1,85 @@
+"""
+=========================================================
+Vectorized PLY writer:
+Fills the vertex structured array column by column (no
+per-point Python work) and writes it as binary little-endian.
+=========================================================
+"""
+
+import numpy as np
+
+# NumPy type codes -> PLY scalar types
+PLY_TYPE_NAMES = {
+    "i1": "char", "u1": "uchar",
+    "i2": "short", "u2": "ushort",
+    "i4": "int", "u4": "uint",
+    "f4": "float", "f8": "double",
+}
+
+
+def vertex_array(points, colors=None, labels=None, coord_dtype="f4",
+                 colors_uint8=False, label_field="class", label_dtype="i4"):
+    """
+    Builds the vertex structured array.
+    Args:
+        points: np.array (Nx3)
+        colors: optional np.array (Nx3) in [0,1]
+        labels: optional np.array (N)
+        coord_dtype: "f4" or "f8" for x/y/z
+        colors_uint8: store colors as uchar 0-255 instead of float 0-1
+    """
+    n = len(points)
+    if colors is not None:
+        n = min(n, len(colors))
+    if labels is not None:
+        n = min(n, len(labels))
+
+    color_dtype = "u1" if colors_uint8 else "f4"
+    fields = [(c, "<" + coord_dtype) for c in ("x", "y", "z")]
+    if colors is not None:
+        fields += [(c, "<" + color_dtype) for c in ("red", "green", "blue")]
+    if labels is not None:
+        fields.append((label_field, "<" + label_dtype))
+
+    v = np.empty(n, dtype=fields)
+    points = np.asarray(points)
+    for i, c in enumerate(("x", "y", "z")):
+        v[c] = points[:n, i]
+
+    if colors is not None:
+        colors = np.asarray(colors)[:n]
+        if colors_uint8 and colors.dtype != np.uint8:
+            colors = np.clip(np.rint(colors * 255.0), 0, 255)
+        for i, c in enumerate(("red", "green", "blue")):
+            v[c] = colors[:, i]
+
+    if labels is not None:
+        v[label_field] = np.asarray(labels)[:n]
+    return v
+
+
+def write_vertex_array(path, v):
+    """
+    Writes a structured vertex array as a binary little-endian PLY.
+    """
+    header = [
+        "ply",
+        "format binary_little_endian 1.0",
+        f"element vertex {len(v)}",
+    ]
+    for name in v.dtype.names:
+        code = v.dtype[name].str[1:]
+        header.append(f"property {PLY_TYPE_NAMES[code]} {name}")
+    header.append("end_header")
+
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        v.astype(v.dtype.newbyteorder("<"), copy=False).tofile(f)
+
+
+def write_ply(path, points, colors=None, labels=None, **kwargs):
+    """
+    Writes points (and optional colors / labels) to a binary PLY.
+    Extra kwargs are forwarded to `vertex_array`.
+    """
+    write_vertex_array(path, vertex_array(points, colors, labels, **kwargs))
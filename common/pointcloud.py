@@ -0,0 +1,274 @@
+"""
+=========================================================
+Shared point cloud loader:
+Memory-maps binary PLY vertex data (or LAS point records, see
+common/las_reader.py) into a NumPy structured array so every
+stage (extractor, rebuild, tube, split) reads the input cloud once. Columns are only materialized when
+they are actually touched.
+=========================================================
+"""
+
+import os
+import numpy as np
+from plyfile import PlyData
+
+# Candidate names for the label field (same order as the extractor)
+LABEL_FIELD_CANDIDATES = ["scalar_Label", "label", "Label", "classification", "class"]
+
+# PLY scalar types -> NumPy type codes
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+
+# Clouds already loaded in this process, keyed by (path, size, mtime, cache)
+_LOADED = {}
+
+
+def find_label_field(field_names):
+    """
+    Returns the name of the label field, or None if there is none.
+    """
+    for candidate in LABEL_FIELD_CANDIDATES:
+        if candidate in field_names:
+            return candidate
+    return None
+
+
+# =========================================================
+# PLY HEADER
+# =========================================================
+def read_ply_header(path):
+    """
+    Parses a PLY header.
+    Returns:
+        dict with "format", "elements" (list of (name, count, properties))
+        and "data_offset" (byte offset where the body starts)
+    """
+    elements = []
+    fmt = None
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"❌ Not a PLY file: {path}")
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"❌ Truncated PLY header: {path}")
+            tokens = line.decode("ascii", errors="replace").split()
+            if not tokens or tokens[0] in ("comment", "obj_info"):
+                continue
+            if tokens[0] == "format":
+                fmt = tokens[1]
+            elif tokens[0] == "element":
+                elements.append((tokens[1], int(tokens[2]), []))
+            elif tokens[0] == "property":
+                if tokens[1] == "list":
+                    elements[-1][2].append((tokens[4], None))
+                else:
+                    elements[-1][2].append((tokens[2], tokens[1]))
+            elif tokens[0] == "end_header":
+                data_offset = f.tell()
+                break
+    return {"format": fmt, "elements": elements, "data_offset": data_offset}
+
+
+def vertex_dtype(properties, fmt):
+    """
+    Builds the structured dtype of the vertex element.
+    Returns None if it contains list properties.
+    """
+    byte_order = ">" if fmt == "binary_big_endian" else "<"
+    fields = []
+    for name, ply_type in properties:
+        if ply_type is None:
+            return None
+        fields.append((name, byte_order + PLY_TYPES[ply_type]))
+    return np.dtype(fields)
+
+
+def map_ply_vertices(path):
+    """
+    Returns the vertex element of a PLY as a read-only structured array.
+    Binary files are memory-mapped; ASCII files fall back to plyfile.
+    """
+    header = read_ply_header(path)
+    fmt = header["format"]
+
+    if fmt in ("binary_little_endian", "binary_big_endian"):
+        offset = header["data_offset"]
+        for name, count, properties in header["elements"]:
+            dtype = vertex_dtype(properties, fmt)
+            if dtype is None:
+                break
+            if name == "vertex":
+                if count == 0:
+                    return np.zeros(0, dtype=dtype)
+                return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            offset += count * dtype.itemsize
+
+    # ASCII or elements with lists before the vertices
+    return PlyData.read(path)["vertex"].data
+
+
+# =========================================================
+# POINT CLOUD
+# =========================================================
+class PointCloud:
+    """
+    Lazy view over the vertices of a labeled point cloud.
+    """
+
+    def __init__(self, vertex, path=None):
+        self.vertex = vertex
+        self.path = path
+        self.field_names = vertex.dtype.names
+        self.label_field = find_label_field(self.field_names)
+        self._xyz = None
+        self._colors = None
+
+    def __len__(self):
+        return len(self.vertex)
+
+    def column(self, name):
+        return self.vertex[name]
+
+    @property
+    def x(self):
+        return self.column("x")
+
+    @property
+    def y(self):
+        return self.column("y")
+
+    @property
+    def z(self):
+        return self.column("z")
+
+    @property
+    def labels(self):
+        if self.label_field is None:
+            return None
+        return self.column(self.label_field)
+
+    @property
+    def has_colors(self):
+        return all(c in self.field_names for c in ("red", "green", "blue"))
+
+    @property
+    def xyz(self):
+        """
+        (N,3) float64 coordinates. Materialized on first access.
+        """
+        if self._xyz is None:
+            self._xyz = self.stack_xyz()
+        return self._xyz
+
+    @property
+    def colors(self):
+        """
+        (N,3) colors in [0,1], or None if the cloud has no RGB.
+        """
+        if self._colors is None and self.has_colors:
+            self._colors = self.stack_colors()
+        return self._colors
+
+    def stack_xyz(self, mask=None, frame=None):
+        """
+        Stacks x/y/z (optionally masked). With a local CoordinateFrame the
+        origin is subtracted column by column and the result is float32.
+        """
+        cols = [self.x, self.y, self.z]
+        if mask is not None:
+            cols = [c[mask] for c in cols]
+        if frame is None:
+            return np.column_stack(cols).astype(np.float64, copy=False)
+        return np.column_stack(
+            [frame.column_to_local(c, axis) for axis, c in enumerate(cols)]
+        )
+
+    def stack_colors(self, mask=None):
+        cols = [self.column(c) for c in ("red", "green", "blue")]
+        if mask is not None:
+            cols = [c[mask] for c in cols]
+        return self.normalize_colors(np.column_stack(cols))
+
+    @staticmethod
+    def normalize_colors(rgb):
+        if np.issubdtype(rgb.dtype, np.integer):
+            return rgb / (255.0 if rgb.dtype.itemsize == 1 else 65535.0)
+        rgb = rgb.astype(np.float64)
+        if len(rgb) and rgb.max() > 1.0:
+            rgb /= 255.0
+        return rgb
+
+    def label_mask(self, include=None, exclude=None):
+        """
+        Boolean mask of points whose label is in `include` and not in `exclude`.
+        Returns None when no filter is requested.
+        """
+        if include is None and exclude is None:
+            return None
+        labels = self.labels
+        if labels is None:
+            raise ValueError("❌ No label field found in point cloud.")
+        mask = np.ones(len(labels), dtype=bool)
+        if include is not None:
+            mask &= np.isin(labels, include)
+        if exclude is not None:
+            mask &= ~np.isin(labels, exclude)
+        return mask
+
+    def select(self, include=None, exclude=None, with_colors=False, frame=None):
+        """
+        Gathers only the points whose label passes the filter.
+        Points are in the working coordinates of `frame` (if given).
+        Returns:
+            (points, labels) or (points, labels, colors)
+        """
+        mask = self.label_mask(include, exclude)
+        points = self.stack_xyz(mask, frame)
+        labels = self.labels
+        if labels is not None:
+            labels = np.asarray(labels if mask is None else labels[mask])
+        if not with_colors:
+            return points, labels
+        colors = self.stack_colors(mask) if self.has_colors else None
+        return points, labels, colors
+
+
+def open_source(path):
+    """
+    Opens the source file as a PointCloud (binary/ASCII PLY or uncompressed LAS).
+    """
+    from common.las_reader import is_las, LasPointCloud
+    if is_las(path):
+        return LasPointCloud(path)
+    return PointCloud(map_ply_vertices(path), path=path)
+
+
+def load_pointcloud(path, cache_dir=None):
+    """
+    Opens a point cloud once per process; later calls reuse the same mapping.
+    With `cache_dir`, the columnar label-sorted cache is used (and built
+    on first use, see common/cloud_cache.py).
+    """
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Point cloud not found: {path}")
+    if cache_dir:
+        cache_dir = os.path.abspath(cache_dir)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, cache_dir)
+    if key not in _LOADED:
+        if cache_dir:
+            from common.cloud_cache import open_cache
+            _LOADED[key] = open_cache(path, cache_dir)
+        else:
+            _LOADED[key] = open_source(path)
+    return _LOADED[key]
@@ -0,0 +1,101 @@
+"""
+=========================================================
+Pole table:
+The poles CSV (poles_MT_info_classified.csv) loaded once as
+NumPy columns plus a Pole_ID -> row index, so geometry stages
+look poles up in O(1) and read coordinates vectorized instead
+of iterating pandas rows or masking the DataFrame per pole.
+=========================================================
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+_LOADED = {}
+
+
+class PoleTable:
+    """
+    Column arrays of the pole table and an ID -> row index.
+    """
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.ids = self.columns["Pole_ID"].astype(np.int64)
+        self.row_of = {int(pid): r for r, pid in enumerate(self.ids)}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls({name: df[name].to_numpy() for name in df.columns})
+
+    @classmethod
+    def from_csv(cls, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"CSV not found: {path}")
+        return cls.from_dataframe(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, pole_id):
+        return int(pole_id) in self.row_of
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def row(self, pole_id):
+        return self.row_of[int(pole_id)]
+
+    def rows(self, pole_ids):
+        """
+        Row index of every ID (KeyError on unknown IDs).
+        """
+        return np.array([self.row_of[int(p)] for p in pole_ids], dtype=np.int64)
+
+    def value(self, pole_id, name):
+        return self.columns[name][self.row(pole_id)].item()
+
+    def record(self, pole_id):
+        """
+        One pole as a dict of native Python values (like Series.to_dict()).
+        """
+        r = self.row(pole_id)
+        return {name: col[r].item() if hasattr(col[r], "item") else col[r]
+                for name, col in self.columns.items()}
+
+    # -------------------------
+    # Vectorized access
+    # -------------------------
+    def centers(self, rows=None):
+        rows = slice(None) if rows is None else rows
+        return np.column_stack([self["Center_X"][rows], self["Center_Y"][rows]]).astype(np.float64)
+
+    def top_points(self, rows, height):
+        """
+        (N,3) points at `height` above the base of each pole.
+        """
+        return np.column_stack([
+            self["Center_X"][rows], self["Center_Y"][rows], self["Base_Z"][rows] + height
+        ]).astype(np.float64)
+
+    def mean_height(self):
+        h = self["Height_m"].astype(np.float64)
+        h = h[~np.isnan(h)]
+        return float(h.mean()) if len(h) else float("nan")
+
+
+def load_pole_table(path):
+    """
+    Pole table of `path`, parsed once per process (reloaded if the file changes).
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _LOADED:
+        for old in [k for k in _LOADED if k[0] == key[0]]:
+            del _LOADED[old]
+        _LOADED[key] = PoleTable.from_csv(path)
+    return _LOADED[key]
@@ -0,0 +1,65 @@
+"""
+=========================================================
+Shared arrays:
+Places NumPy arrays in multiprocessing.shared_memory so a
+process pool can read them without pickling. The parent
+owns the blocks (create / unlink); workers attach to them
+by name from a small picklable spec.
+=========================================================
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays backed by shared memory blocks (owned by this process).
+    """
+
+    def __init__(self, arrays):
+        self.blocks = {}
+        self.arrays = {}
+        self.spec = {}
+        try:
+            for name, arr in arrays.items():
+                arr = np.ascontiguousarray(arr)
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+                view[...] = arr
+                self.blocks[name] = shm
+                self.arrays[name] = view
+                self.spec[name] = (shm.name, arr.shape, arr.dtype.str)
+        except Exception:
+            self.release()
+            raise
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def release(self):
+        self.arrays = {}
+        for shm in self.blocks.values():
+            shm.close()
+            shm.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def attach_shared(spec):
+    """
+    Worker side: maps every array of `spec` (SharedArrays.spec).
+    Returns:
+        (arrays dict, blocks) - keep `blocks` alive while the arrays are used
+    """
+    arrays, blocks = {}, []
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return arrays, blocks
@@ -0,0 +1,96 @@
+"""
+=========================================================
+Voxel connected components:
+Points are hashed into cubic voxels; occupied voxels that
+touch (26-neighbourhood by default) form one component.
+Cost grows with the number of points and occupied voxels,
+not with their pairwise distances (no O(n²) DBSCAN).
+
+Shared by the obstacle instances of dms/tube.py and the
+"voxel_cc" pole extractor.
+=========================================================
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from common.cluster_labels import renumber_labels
+
+# Half of each neighbourhood (the other half is the reverse edge)
+_OFFSETS = {
+    6: [(1, 0, 0), (0, 1, 0), (0, 0, 1)],
+    26: [
+        (di, dj, dk)
+        for di in (-1, 0, 1) for dj in (-1, 0, 1) for dk in (-1, 0, 1)
+        if (di, dj, dk) > (0, 0, 0)
+    ],
+}
+
+
+def voxel_keys(points, voxel_size):
+    """
+    Integer voxel coordinates of each point and their packed int64 keys.
+    Returns:
+        ijk (N,3), keys (N,), dims (3,)
+    """
+    points = np.asarray(points)
+    ijk = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    dims = ijk.max(axis=0) + 1
+    keys = (ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]
+    return ijk, keys, dims
+
+
+def voxel_components(points, voxel_size, min_points=1, connectivity=26):
+    """
+    Connected components of the occupied voxels.
+
+    Args:
+        points: (N,3)
+        voxel_size: voxel edge in metres (points in touching voxels connect)
+        min_points: smaller components are labelled -1 (noise)
+        connectivity: 6 (faces) or 26 (faces, edges and corners)
+    Returns:
+        labels (N,) int64: 0..K-1 in order of first appearance, -1 for noise
+    """
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    ijk, keys, dims = voxel_keys(points, voxel_size)
+    vox_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    vox_ijk = ijk[first]
+    m = len(vox_keys)
+
+    # Voxels that have a neighbour at -1 / +1 along each axis (inside the grid)
+    has_nb = {}
+    for axis in range(3):
+        col = vox_ijk[:, axis]
+        has_nb[axis, -1] = col > 0
+        has_nb[axis, 1] = col < dims[axis] - 1
+
+    rows, cols = [], []
+    for off in _OFFSETS[connectivity]:
+        inside = np.ones(m, dtype=bool)
+        for axis, d in enumerate(off):
+            if d:
+                inside &= has_nb[axis, d]
+        src = np.flatnonzero(inside)
+        # Neighbour keys are a constant shift of the (sorted) voxel keys
+        nb_keys = vox_keys[src] + (off[0] * dims[1] + off[1]) * dims[2] + off[2]
+        pos = np.minimum(np.searchsorted(vox_keys, nb_keys), m - 1)
+        hit = vox_keys[pos] == nb_keys
+        rows.append(src[hit])
+        cols.append(pos[hit])
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(m, m))
+    _, vox_comp = connected_components(graph, directed=False)
+
+    comp = vox_comp[inverse.ravel()]
+    sizes = np.bincount(comp)
+    comp[sizes[comp] < min_points] = -1
+
+    # Renumber by first appearance, so labels do not depend on voxel order
+    return renumber_labels(comp)
@@ -0,0 +1,20 @@
+"""
+=========================================================
+Worker count:
+Single rule for the process pools (tube.py spans, tiled
+DBSCAN tiles) to turn a configured `workers` value into a
+number of processes.
+=========================================================
+"""
+
+import os
+
+
+def resolve_workers(workers):
+    """
+    Number of processes: None means 1, values <= 0 mean all cores.
+    """
+    workers = 1 if workers is None else int(workers)
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
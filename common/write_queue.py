@@ -0,0 +1,70 @@
+"""
+=========================================================
+Bounded write queue:
+A thread pool serializes and writes finished outputs while
+the producer keeps computing the next ones. At most
+`max_pending` outputs are queued or being written; submit()
+blocks beyond that (backpressure), so memory stays capped.
+Per-file timings are collected for the report.
+=========================================================
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedWriter:
+    """
+    Producer/consumer writer: submit(path, fn, *args) runs fn(path, *args)
+    on a worker thread. fn may return the number of bytes it wrote;
+    otherwise the size of `path` is reported.
+    """
+
+    def __init__(self, workers=2, max_pending=4):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.slots = threading.BoundedSemaphore(max(1, max_pending))
+        self.futures = []
+
+    def submit(self, path, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        self.slots.acquire()
+        blocked = time.perf_counter() - t0
+        queued_at = time.perf_counter()
+
+        def task():
+            start = time.perf_counter()
+            try:
+                written = fn(path, *args, **kwargs)
+            finally:
+                self.slots.release()
+            return {
+                "path": path,
+                "blocked_s": blocked,
+                "queued_s": start - queued_at,
+                "write_s": time.perf_counter() - start,
+                "bytes": written if isinstance(written, int) else os.path.getsize(path),
+            }
+
+        try:
+            future = self.pool.submit(task)
+        except Exception:
+            self.slots.release()
+            raise
+        self.futures.append(future)
+        return future
+
+    def close(self):
+        """
+        Waits for every pending write. Returns the per-file timings in
+        submission order (re-raises the first write error).
+        """
+        self.pool.shutdown(wait=True)
+        return [f.result() for f in self.futures]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,159 @@
+"""
+=========================================================
+Minimum-clearance profile per span.
+
+Stations are placed every `spacing` metres along each phase
+wire of a span, and the distance from every station to the
+nearest point of each obstacle class is read from per-class
+cKDTrees. The trees only hold the points of the span corridors
+(gathered with the XY grid index), since queries never reach
+beyond `max_distance`. All stations of all spans are answered
+in one batched query per class.
+
+Outputs:
+    - per span and class: minimum distance, its station and phase
+      (collision_report.json, "clearance")
+    - full profiles in CSR layout (clearance_profiles.npz)
+=========================================================
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+PROFILES_FILE = "clearance_profiles.npz"
+
+
+def estaciones_tramo(p1, p2, dz_fases, spacing):
+    """
+    Stations along every phase wire of the span p1-p2.
+    Returns:
+        points (M,3), distance along the span (M,), phase index (M,)
+    """
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+    L = float(np.linalg.norm(p2 - p1))
+    n = max(int(np.ceil(L / spacing)), 1) + 1
+    t = np.linspace(0.0, 1.0, n)
+    base = p1 + t[:, None] * (p2 - p1)
+    points = np.concatenate([base + np.array([0.0, 0.0, dz]) for dz in dz_fases])
+    return points, np.tile(t * L, len(dz_fases)), np.repeat(np.arange(len(dz_fases)), n)
+
+
+def puntos_corredor(index, segmentos, dz_fases, max_distance):
+    """
+    Indices of the points that can lie within `max_distance` of a station:
+    grid cells within max_distance (XY) of each span, then a Z band that
+    covers every phase.
+    """
+    partes = []
+    dz_lo, dz_hi = min(dz_fases), max(dz_fases)
+    for p1, p2 in segmentos:
+        cand = index.candidates(p1, p2, max_distance)
+        z = index.points[cand, 2]
+        lo = min(p1[2], p2[2]) + dz_lo - max_distance
+        hi = max(p1[2], p2[2]) + dz_hi + max_distance
+        partes.append(cand[(z >= lo) & (z <= hi)])
+    if not partes:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(partes))
+
+
+class ClearanceIndex:
+    """
+    One cKDTree per obstacle class over the points of the cloud
+    (only the points of `subset`, e.g. puntos_corredor, if given).
+    """
+
+    def __init__(self, points, labels, classes=None, subset=None):
+        labels = np.asarray(labels)
+        if subset is not None:
+            points, labels = points[subset], labels[subset]
+        present = np.unique(labels)
+        if classes is not None:
+            present = present[np.isin(present, classes)]
+        self.classes = [int(c) for c in present]
+        self.trees = [cKDTree(points[labels == c]) for c in self.classes]
+
+    def query(self, stations, max_distance, workers=-1):
+        """
+        (M, n_classes) distance of each station to the nearest point of each
+        class; +inf when there is none within `max_distance`.
+        """
+        out = np.full((len(stations), len(self.classes)), np.inf, dtype=np.float32)
+        for j, tree in enumerate(self.trees):
+            d, _ = tree.query(
+                stations, k=1, distance_upper_bound=max_distance, workers=workers
+            )
+            out[:, j] = d
+        return out
+
+
+def perfiles_holgura(index, segmentos, dz_fases, spacing, max_distance):
+    """
+    Clearance profiles of every span.
+    Returns:
+        dict with indptr (stations of span s are indptr[s]:indptr[s+1]),
+        stations (M,3), station_m, phase, distances (M, n_classes), classes
+    """
+    partes = [estaciones_tramo(p1, p2, dz_fases, spacing) for p1, p2 in segmentos]
+    indptr = np.zeros(len(partes) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(p[0]) for p in partes])
+    if partes:
+        stations = np.concatenate([p[0] for p in partes])
+        station_m = np.concatenate([p[1] for p in partes])
+        phase = np.concatenate([p[2] for p in partes])
+    else:
+        stations, station_m, phase = np.zeros((0, 3)), np.zeros(0), np.zeros(0, dtype=int)
+    return {
+        "indptr": indptr,
+        "stations": stations,
+        "station_m": station_m.astype(np.float32),
+        "phase": phase.astype(np.uint8),
+        "distances": index.query(stations, max_distance),
+        "classes": np.array(index.classes, dtype=np.int32),
+    }
+
+
+def resumen_holgura(claves, perfiles, frame, class_names):
+    """
+    Minimum clearance per span and class, for the report.
+    """
+    indptr, dist = perfiles["indptr"], perfiles["distances"]
+    resumen = []
+    for s, (from_id, to_id) in enumerate(claves):
+        a, b = indptr[s], indptr[s + 1]
+        clases = []
+        if b > a:
+            for j, cls in enumerate(perfiles["classes"]):
+                k = int(np.argmin(dist[a:b, j]))
+                d = float(dist[a + k, j])
+                if not np.isfinite(d):
+                    continue
+                clases.append({
+                    "object_class_id": int(cls),
+                    "object_class_name": class_names.get(int(cls), f"Unknown_{cls}"),
+                    "min_distance": round(d, 3),
+                    "station_m": round(float(perfiles["station_m"][a + k]), 3),
+                    "phase": int(perfiles["phase"][a + k]),
+                    "station_point": frame.to_global(perfiles["stations"][a + k]).tolist()
+                })
+        clases.sort(key=lambda c: c["min_distance"])
+        resumen.append({"from_pole": from_id, "to_pole": to_id, "classes": clases})
+    return resumen
+
+
+def guardar_perfiles(path, claves, perfiles):
+    """
+    Compact per-span array file (station coordinates are not stored:
+    they follow from the span endpoints, station_m and phase).
+    """
+    np.savez_compressed(
+        path,
+        from_pole=np.array([k[0] for k in claves], dtype=np.int64),
+        to_pole=np.array([k[1] for k in claves], dtype=np.int64),
+        indptr=perfiles["indptr"],
+        station_m=perfiles["station_m"],
+        phase=perfiles["phase"],
+        classes=perfiles["classes"],
+        distances=perfiles["distances"],
+    )
@@ -0,0 +1,354 @@
+"""
+=========================================================
+Per-span collision evaluation.
+
+A span has one tube per phase (crossarm); the phase tubes only
+differ by a Z offset, so the candidates of a span are gathered
+once and all phases are evaluated in a single pass
+(dms.geometry.distancias_fases). The squared distance of each
+candidate to every phase axis is computed once and then
+thresholded for every clearance criterion (Criterios).
+
+evaluar_tramos_paralelo fans spans out to a process pool. The
+points, labels and grid tables live in shared memory and
+results are merged back in span order.
+=========================================================
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from common.shared_arrays import SharedArrays, attach_shared
+from common.voxel_components import voxel_components
+from dms.geometry import distancias_fases, contar_clases
+from dms.spatial import GridIndex, query_segments_kdtree
+
+
+def fases_z(num_phases, spacing, top_offset):
+    """
+    Z offset of each phase tube, relative to the pole top.
+    """
+    return [-top_offset - i * spacing for i in range(num_phases)]
+
+
+def segmento_envolvente(p1, p2, radius, dz_fases):
+    """
+    Segment and radius of one cylinder that encloses all phase tubes.
+    """
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+    lo, hi = min(dz_fases), max(dz_fases)
+    mid, half = (lo + hi) / 2.0, (hi - lo) / 2.0
+    axis = p2 - p1
+    L = np.linalg.norm(axis)
+    u = axis / L if L >= 1e-6 else np.zeros(3)
+    ext = half * abs(u[2])
+    dz = np.array([0.0, 0.0, mid])
+    return p1 + dz - u * ext, p2 + dz + u * ext, radius + half
+
+
+def candidatos_grid(index, p1, p2, radius):
+    """
+    Points in the grid cells touched by the XY footprint of the span.
+    Phase tubes share that footprint, so one lookup serves all of them.
+    """
+    return np.sort(index.candidates(p1, p2, radius))
+
+
+def candidatos_kdtree(pts, P1, P2, radius, dz_fases):
+    """
+    Candidates of every span in one batched cKDTree query over the
+    cylinders enclosing their phase tubes.
+    """
+    from scipy.spatial import cKDTree
+
+    env = [segmento_envolvente(a, b, radius, dz_fases) for a, b in zip(P1, P2)]
+    if not env:
+        return []
+    A = np.array([e[0] for e in env])
+    B = np.array([e[1] for e in env])
+    R = np.array([e[2] for e in env])
+
+    indptr, indices = query_segments_kdtree(cKDTree(pts), pts, A, B, R)
+    return [indices[a:b] for a, b in zip(indptr[:-1], indptr[1:])]
+
+
+def _por_fase(d2s, cand, labels, umbral2):
+    resultado = []
+    for d2 in d2s:
+        m = d2 <= umbral2
+        resultado.append((cand[m], contar_clases(labels[m])))
+    return resultado
+
+
+class Criterios:
+    """
+    Clearance criteria evaluated from a single distance computation: the
+    tube radius, a list of extra radii, a per-class radius table (classes
+    not listed use the tube radius) and a histogram of the distance to the
+    nearest phase axis per class.
+    """
+
+    def __init__(self, radius, radii=(), class_radii=None, hist_step=None):
+        self.radius = float(radius)
+        self.radii = sorted({float(r) for r in radii})
+        self.class_radii = {int(k): float(v) for k, v in (class_radii or {}).items()}
+        self.max_radius = max([self.radius, *self.radii, *self.class_radii.values()])
+        self.bin_edges = None
+        if hist_step:
+            # Candidates only reach max_radius: the last bin is closed there
+            n_bins = int(np.ceil(self.max_radius / hist_step))
+            self.bin_edges = np.append(np.arange(n_bins) * float(hist_step), self.max_radius)
+
+    def umbral_por_punto(self, labels, dtype=np.float64):
+        r2 = np.full(len(labels), self.radius ** 2, dtype=dtype)
+        for cls, r in self.class_radii.items():
+            r2[labels == cls] = r * r
+        return r2
+
+    def histograma(self, d2s, labels):
+        """
+        {class: counts per bin} of the distance to the nearest phase axis.
+        """
+        d2 = np.minimum.reduce(d2s)
+        # Same test as the tubes, so every backend counts the same points
+        dentro = d2 <= self.max_radius ** 2
+        if not np.any(dentro):
+            return {}
+        n_bins = len(self.bin_edges) - 1
+        step = self.bin_edges[1] if n_bins > 1 else self.max_radius
+        d = np.sqrt(d2[dentro].astype(np.float64))
+        b = np.minimum((d / step).astype(np.int64), n_bins - 1)
+        clases, inv = np.unique(labels[dentro], return_inverse=True)
+        counts = np.bincount(inv * n_bins + b, minlength=len(clases) * n_bins)
+        counts = counts.reshape(len(clases), n_bins)
+        return {int(c): row for c, row in zip(clases, counts)}
+
+
+def evaluar_tramo(pts, labels, cand, p1, p2, dz_fases, criterios):
+    """
+    Evaluates all phase tubes of a span over its candidates, for every
+    criterion, from one distance computation.
+    Returns:
+        dict with
+            "fases": list (one per phase) of (indices into pts, {class: count})
+                     at the tube radius
+            "radii": {radius: same list} for each extra radius
+            "class_radii": same list with the per-class radii (or None)
+            "hist": {class: counts} (or None)
+    """
+    d2s = distancias_fases(pts[cand], p1, p2, dz_fases)
+    lbl = labels[cand]
+    return {
+        "fases": _por_fase(d2s, cand, lbl, criterios.radius ** 2),
+        "radii": {r: _por_fase(d2s, cand, lbl, r * r) for r in criterios.radii},
+        "class_radii": (
+            _por_fase(d2s, cand, lbl, criterios.umbral_por_punto(lbl, d2s[0].dtype))
+            if criterios.class_radii else None
+        ),
+        "hist": (
+            criterios.histograma(d2s, lbl) if criterios.bin_edges is not None else None
+        ),
+    }
+
+
+def evaluar_fases(pts, labels, cand, p1, p2, radius, dz_fases):
+    """
+    Evaluates all phase tubes of a span over its candidates.
+    Returns:
+        list (one per phase) of (indices into pts, {class: count})
+    """
+    return evaluar_tramo(pts, labels, cand, p1, p2, dz_fases, Criterios(radius))["fases"]
+
+
+def colisiones_por_tramo(claves, por_tramo, campo, pts, frame, min_points,
+                         class_names, radio=None):
+    """
+    Report entries of the spans that collide under one criterion.
+
+    A phase counts when it holds at least `min_points` points, and a class
+    of that phase is reported when it reaches `min_points` on its own;
+    counts of the same class are added over the phases of the span.
+
+    Args:
+        claves: (from_id, to_id) of each span, parallel to `por_tramo`
+        campo: "fases" | "class_radii" | "radii" (then `radio` selects it)
+    Returns:
+        (list of collision entries, set of colliding span keys)
+    """
+    resultados = {}
+    for key, res in zip(claves, por_tramo):
+        fases = res[campo] if radio is None else res[campo][radio]
+        resultados.setdefault(key, []).extend(fases)
+
+    colisiones, con_colision = [], set()
+    for (from_id, to_id), fases in resultados.items():
+        collision_map = {}
+        hay_colision = False
+
+        for idx, conteo in fases:
+            if len(idx) < min_points:
+                continue
+
+            hay_colision = True
+
+            for cls, n in conteo.items():
+                if n < min_points:
+                    continue
+                collision_map.setdefault(cls, {
+                    "object_class_id": int(cls),
+                    "object_class_name": class_names.get(cls, f"Unknown_{cls}"),
+                    "num_points": 0,
+                    "sample_point": frame.to_global(pts[idx[0]]).tolist()
+                })["num_points"] += int(n)
+
+        if hay_colision:
+            con_colision.add((from_id, to_id))
+            colisiones.append({
+                "id": len(colisiones) + 1,
+                "from_pole": from_id,
+                "to_pole": to_id,
+                "collisions": list(collision_map.values())
+            })
+    return colisiones, con_colision
+
+
+def histogramas_por_tramo(claves, por_tramo, criterios):
+    """
+    Distance histograms per span and class (classes added over repeated spans).
+    """
+    tramos = {}
+    for key, res in zip(claves, por_tramo):
+        acum = tramos.setdefault(key, {})
+        for cls, counts in (res["hist"] or {}).items():
+            acum[cls] = acum.get(cls, 0) + counts
+    return {
+        "bin_edges": criterios.bin_edges.tolist(),
+        "spans": [
+            {
+                "from_pole": from_id,
+                "to_pole": to_id,
+                "classes": {str(c): np.asarray(v).tolist() for c, v in clases.items()}
+            }
+            for (from_id, to_id), clases in tramos.items() if clases
+        ]
+    }
+
+
+# =========================================================
+# OBSTACLE INSTANCES
+# =========================================================
+def instancias_obstaculo(pts, labels, tramos_res, dz_fases, frame, class_names,
+                         voxel_size=0.5, min_points=5):
+    """
+    Splits the points inside the tubes of a span into obstacle instances
+    (voxel connected components).
+
+    Args:
+        tramos_res: list of ((p1, p2), evaluar_tramo result) of the span
+    Returns:
+        list of instances sorted by closest distance to a phase axis
+    """
+    partes = [idx for _, res in tramos_res for idx, _ in res["fases"]]
+    idx = np.unique(np.concatenate(partes)) if partes else np.zeros(0, dtype=np.int64)
+    if len(idx) == 0:
+        return []
+
+    puntos = pts[idx]
+    d2 = np.minimum.reduce([
+        d for (p1, p2), _ in tramos_res for d in distancias_fases(puntos, p1, p2, dz_fases)
+    ])
+    dist = np.sqrt(d2.astype(np.float64))
+    glob = frame.to_global(puntos)
+
+    comp = voxel_components(puntos, voxel_size, min_points)
+    kept = np.flatnonzero(comp >= 0)
+    orden = kept[np.argsort(comp[kept], kind="stable")]
+    cortes = np.cumsum(np.bincount(comp[kept]))[:-1] if len(kept) else []
+
+    instancias = []
+    for sel in np.split(orden, cortes) if len(kept) else []:
+        p = glob[sel]
+        k = int(np.argmin(dist[sel]))
+        conteo = contar_clases(labels[idx[sel]])
+        principal = max(conteo, key=conteo.get)
+        instancias.append({
+            "id": 0,
+            "num_points": int(len(sel)),
+            "object_class_id": int(principal),
+            "object_class_name": class_names.get(principal, f"Unknown_{principal}"),
+            "classes": {str(cls): n for cls, n in conteo.items()},
+            "centroid": p.mean(axis=0).tolist(),
+            "bbox_min": p.min(axis=0).tolist(),
+            "bbox_max": p.max(axis=0).tolist(),
+            "closest_distance": round(float(dist[sel][k]), 3),
+            "closest_point": p[k].tolist(),
+        })
+    instancias.sort(key=lambda o: o["closest_distance"])
+    for i, o in enumerate(instancias, start=1):
+        o["id"] = i
+    return instancias
+
+
+# =========================================================
+# PROCESS POOL
+# =========================================================
+_WORKER = {}
+
+
+def _init_worker(spec, meta):
+    arrays, blocks = attach_shared(spec)
+    tables = {k: arrays[k] for k in ("order", "cell_keys", "cell_starts", "cell_stops")}
+    tables["origin_xy"], tables["shape"] = meta["origin_xy"], meta["shape"]
+    _WORKER["blocks"] = blocks
+    _WORKER["labels"] = arrays["labels"]
+    _WORKER["index"] = GridIndex(arrays["points"], meta["cell_size"], tables)
+    _WORKER["criterios"] = meta["criterios"]
+    _WORKER["dz_fases"] = meta["dz_fases"]
+
+
+def _evaluar_lote(lote):
+    index, labels = _WORKER["index"], _WORKER["labels"]
+    criterios, dz_fases = _WORKER["criterios"], _WORKER["dz_fases"]
+    resultado = []
+    for p1, p2 in lote:
+        cand = candidatos_grid(index, p1, p2, criterios.max_radius)
+        resultado.append(evaluar_tramo(index.points, labels, cand, p1, p2, dz_fases, criterios))
+    return resultado
+
+
+def evaluar_tramos_paralelo(pts, labels, segmentos, criterios, dz_fases,
+                            workers, cell_size, spans_per_task=8):
+    """
+    Same result as evaluar_tramo over every (p1, p2) of `segmentos`, spread
+    over `workers` processes. The points are shared as they are, so the
+    returned indices (into `pts`) are identical to the serial run.
+
+    Returns:
+        list (one per segment, in order) of evaluar_tramo results
+    """
+    pts = np.ascontiguousarray(pts)
+    grid = GridIndex(pts, cell_size)
+
+    meta = {
+        "origin_xy": grid.origin_xy, "shape": grid.shape, "cell_size": grid.cell_size,
+        "criterios": criterios, "dz_fases": list(dz_fases),
+    }
+    lotes = [
+        [(np.asarray(a), np.asarray(b)) for a, b in segmentos[i:i + spans_per_task]]
+        for i in range(0, len(segmentos), spans_per_task)
+    ]
+
+    with SharedArrays({
+        "points": pts, "labels": np.asarray(labels), "order": grid.order,
+        "cell_keys": grid.cell_keys, "cell_starts": grid.cell_starts,
+        "cell_stops": grid.cell_stops,
+    }) as shared:
+        del grid
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(shared.spec, meta)
+        ) as pool:
+            # map() yields in submission order -> deterministic merge
+            por_tramo = [r for lote in pool.map(_evaluar_lote, lotes) for r in lote]
+
+    return por_tramo
@@ -0,0 +1,198 @@
+"""
+Geometric kernels shared by tube.py and split.py.
+"""
+
+import numpy as np
+
+
+# Points per chunk: (chunk, 3) float64 buffers stay within L2 cache
+DEFAULT_KERNEL_CHUNK = 32_768
+
+
+def puntos_en_cilindro(points, p1, p2, radius):
+    """
+    Indices of the points inside the finite cylinder p1-p2 of the given radius.
+    """
+    return puntos_en_capsula(points, p1, p2, radius)
+
+
+def _eje(points, p1, p2):
+    # Keep the dtype of the cloud (no float64 promotion in local mode)
+    dtype = points.dtype if points.dtype in (np.float32, np.float64) else np.dtype(np.float64)
+    p1 = np.asarray(p1, dtype=np.float64)
+    axis = np.asarray(p2, dtype=np.float64) - p1
+    L = float(np.linalg.norm(axis))
+    u = axis / L if L >= 1e-6 else axis
+    return dtype, p1.astype(dtype), u.astype(dtype), L
+
+
+def puntos_en_capsula(points, p1, p2, radius, caps=False, as_mask=False,
+                      chunk_size=DEFAULT_KERNEL_CHUNK, engine="numpy"):
+    """
+    Points within `radius` of the segment p1-p2, processed in chunks.
+
+    The cloud is scanned in blocks of `chunk_size` points through buffers
+    allocated once per call, and the squared perpendicular distance is
+    compared with radius², so no N×3 temporaries are created.
+
+    Args:
+        caps: False = finite cylinder (flat ends, as the tubes are drawn),
+              True = capsule (hemispherical ends)
+        as_mask: return a boolean mask of len(points) instead of indices
+        engine: "numpy" (default) or "numba" (JIT loop, if numba is installed)
+    Returns:
+        ascending indices, or a boolean mask
+    """
+    n = len(points)
+    dtype, a, u, L = _eje(points, p1, p2)
+    mask = np.zeros(n, dtype=bool)
+    if L < 1e-6 or n == 0:
+        return mask if as_mask else np.flatnonzero(mask)
+
+    if engine == "numba":
+        kernel = _numba_kernel()
+        if kernel is not None:
+            kernel(points, a, u, L, float(radius) ** 2, caps, mask)
+            return mask if as_mask else np.flatnonzero(mask)
+
+    m = min(chunk_size, n)
+    rel = np.empty((m, 3), dtype=dtype)
+    tmp = np.empty((m, 3), dtype=dtype)
+    proj = np.empty(m, dtype=dtype)
+    d2 = np.empty(m, dtype=dtype)
+    ok = np.empty(m, dtype=bool)
+    r2 = float(radius) ** 2
+
+    for start in range(0, n, m):
+        k = min(m, n - start)
+        rel_k, tmp_k, proj_k, d2_k, ok_k = rel[:k], tmp[:k], proj[:k], d2[:k], ok[:k]
+        out = mask[start:start + k]
+
+        np.subtract(points[start:start + k], a, out=rel_k)
+        np.dot(rel_k, u, out=proj_k)
+        if caps:
+            np.clip(proj_k, 0.0, L, out=proj_k)
+            out[...] = True
+        else:
+            np.greater_equal(proj_k, 0.0, out=out)
+            np.less_equal(proj_k, L, out=ok_k)
+            out &= ok_k
+
+        # Perpendicular vector in place: rel - proj·u
+        np.multiply(proj_k[:, None], u, out=tmp_k)
+        np.subtract(rel_k, tmp_k, out=rel_k)
+        np.einsum("ij,ij->i", rel_k, rel_k, out=d2_k)
+        np.less_equal(d2_k, r2, out=ok_k)
+        out &= ok_k
+
+    return mask if as_mask else np.flatnonzero(mask)
+
+
+_NUMBA = {}
+
+
+def _numba_kernel():
+    """
+    JIT-compiled capsule test (compiled on first use). None without numba.
+    """
+    if "kernel" in _NUMBA:
+        return _NUMBA["kernel"]
+    try:
+        import numba
+    except ImportError:
+        print("⚠️ numba is not installed, using the NumPy kernel.")
+        _NUMBA["kernel"] = None
+        return None
+
+    @numba.njit(parallel=True)
+    def kernel(points, a, u, L, r2, caps, mask):
+        for i in numba.prange(points.shape[0]):
+            rx = points[i, 0] - a[0]
+            ry = points[i, 1] - a[1]
+            rz = points[i, 2] - a[2]
+            t = rx * u[0] + ry * u[1] + rz * u[2]
+            if caps:
+                t = min(max(t, 0.0), L)
+            elif t < 0.0 or t > L:
+                continue
+            wx = rx - t * u[0]
+            wy = ry - t * u[1]
+            wz = rz - t * u[2]
+            mask[i] = wx * wx + wy * wy + wz * wz <= r2
+
+    _NUMBA["kernel"] = kernel
+    return kernel
+
+
+def distancia_a_segmento_2d(points_xy, a, b):
+    """
+    Distance from each 2D point to the segment a-b.
+    """
+    ab = np.asarray(b, dtype=np.float64) - a
+    L2 = float(np.dot(ab, ab))
+    rel = points_xy - a
+    if L2 < 1e-12:
+        return np.linalg.norm(rel, axis=1)
+    t = np.clip(rel @ ab / L2, 0.0, 1.0)
+    return np.linalg.norm(rel - np.outer(t, ab), axis=1)
+
+
+def distancias_fases(points, p1, p2, dz_fases, chunk_size=DEFAULT_KERNEL_CHUNK):
+    """
+    Squared distance of every point to the axis of each phase tube of a span.
+
+    Phase k is the cylinder (p1 + dz_k·ẑ) -> (p2 + dz_k·ẑ). All phases share
+    the axis direction, so the axial projection and the perpendicular vector
+    are computed once per point and each phase only needs a scalar update.
+    Points are processed in chunks of `chunk_size`.
+
+    Returns:
+        list (one per phase) of squared perpendicular distances, +inf for
+        points outside the axial range of the tube
+    """
+    dtype, a, u, L = _eje(points, p1, p2)
+    if L < 1e-6 or len(points) == 0:
+        return [np.full(len(points), np.inf, dtype=dtype) for _ in dz_fases]
+
+    u64 = u.astype(np.float64)
+    # c = ẑ - u_z·u: change of the perpendicular vector per metre of Z offset
+    c = np.array([0.0, 0.0, 1.0]) - u64[2] * u64
+    c_t = c.astype(dtype)
+    c2 = float(c @ c)
+
+    d2s = [np.empty(len(points), dtype=dtype) for _ in dz_fases]
+    for start in range(0, len(points), chunk_size):
+        rel = points[start:start + chunk_size] - a
+        proj = rel @ u
+        rel -= np.outer(proj, u)
+        w2 = np.einsum("ij,ij->i", rel, rel)
+        wc = rel @ c_t
+
+        for d2, dz in zip(d2s, dz_fases):
+            proj_k = proj - float(dz * u64[2])
+            perp2 = w2 - 2.0 * dz * wc + dz * dz * c2
+            perp2[(proj_k < 0) | (proj_k > L)] = np.inf
+            d2[start:start + len(perp2)] = perp2
+    return d2s
+
+
+def puntos_en_fases(points, p1, p2, radius, dz_fases):
+    """
+    Points inside every phase tube of a span, in a single pass.
+
+    Returns:
+        list with the (ascending) indices inside each phase
+    """
+    r2 = radius * radius
+    return [np.flatnonzero(d2 <= r2) for d2 in distancias_fases(points, p1, p2, dz_fases)]
+
+
+def contar_clases(labels):
+    """
+    Points per class, in order of first appearance (like collections.Counter).
+    """
+    if len(labels) == 0:
+        return {}
+    clases, primero, conteo = np.unique(labels, return_index=True, return_counts=True)
+    orden = np.argsort(primero)
+    return {int(clases[i]): int(conteo[i]) for i in orden}
@@ -0,0 +1,102 @@
+"""
+=========================================================
+Analytic surface samplers.
+
+Uniform (area-weighted) point samples on the surface of
+cylinders and boxes, generated directly with NumPy: same
+distribution as building the Open3D mesh and calling
+sample_points_uniformly, without the mesh.
+=========================================================
+"""
+
+import numpy as np
+
+
+def _base_ortonormal(u):
+    """
+    Two unit vectors perpendicular to `u` and to each other.
+    """
+    ref = np.array([1.0, 0.0, 0.0]) if abs(u[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    e1 = np.cross(u, ref)
+    e1 /= np.linalg.norm(e1)
+    return e1, np.cross(u, e1)
+
+
+def area_cilindro(p1, p2, radius):
+    L = float(np.linalg.norm(np.asarray(p2, dtype=np.float64) - p1))
+    return 2.0 * np.pi * radius * (L + radius)
+
+
+def area_caja(mn, mx):
+    d = np.asarray(mx, dtype=np.float64) - mn
+    return 2.0 * (d[0] * d[1] + d[1] * d[2] + d[0] * d[2])
+
+
+def muestrear_cilindro(p1, p2, radius, n, rng):
+    """
+    n points on the closed cylinder p1-p2 (side and both caps).
+    """
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+    axis = p2 - p1
+    L = float(np.linalg.norm(axis))
+    if L < 1e-6 or n <= 0:
+        return np.zeros((0, 3))
+    u = axis / L
+    e1, e2 = _base_ortonormal(u)
+
+    # Side vs caps by area: 2πrL vs 2πr²
+    en_lado = rng.random(n) < L / (L + radius)
+    theta = rng.random(n) * 2.0 * np.pi
+    t = np.where(en_lado, rng.random(n) * L, np.where(rng.random(n) < 0.5, 0.0, L))
+    r = np.where(en_lado, radius, radius * np.sqrt(rng.random(n)))
+
+    return (
+        p1
+        + t[:, None] * u
+        + (r * np.cos(theta))[:, None] * e1
+        + (r * np.sin(theta))[:, None] * e2
+    )
+
+
+def muestrear_caja(mn, mx, n, rng):
+    """
+    n points on the surface of the axis-aligned box mn-mx.
+    """
+    mn = np.asarray(mn, dtype=np.float64)
+    mx = np.asarray(mx, dtype=np.float64)
+    d = mx - mn
+    if n <= 0:
+        return np.zeros((0, 3))
+
+    # Face pairs normal to x, y, z, weighted by their area
+    areas = np.array([d[1] * d[2], d[0] * d[2], d[0] * d[1]])
+    eje = rng.choice(3, size=n, p=areas / areas.sum())
+    pts = mn + rng.random((n, 3)) * d
+    lado = rng.random(n) < 0.5
+    filas = np.arange(n)
+    pts[filas, eje] = np.where(lado, mn[eje], mx[eje])
+    return pts
+
+
+def muestrear_partes(partes, n, rng):
+    """
+    n points spread over several parts in proportion to their area, as
+    sampling the merged mesh would do.
+
+    Args:
+        partes: list of ("cylinder", p1, p2, radius) or ("box", min, max)
+    """
+    if not partes or n <= 0:
+        return np.zeros((0, 3))
+    areas = np.array([
+        area_cilindro(p[1], p[2], p[3]) if p[0] == "cylinder" else area_caja(p[1], p[2])
+        for p in partes
+    ])
+    cuantos = rng.multinomial(n, areas / areas.sum())
+    trozos = [
+        muestrear_cilindro(p[1], p[2], p[3], k, rng) if p[0] == "cylinder"
+        else muestrear_caja(p[1], p[2], k, rng)
+        for p, k in zip(partes, cuantos)
+    ]
+    return np.vstack(trozos)
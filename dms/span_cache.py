@@ -0,0 +1,156 @@
+"""
+=========================================================
+Per-span result cache for tube.py.
+
+Every span result (evaluar_tramo: point indices and class
+counts per phase and criterion, plus the distance histogram)
+is stored as one .npz file keyed by the span endpoints and
+everything else that affects it: radii, min_points_collision,
+phases, removed classes, coordinate frame and the fingerprint
+of the input cloud. A rerun after editing connections.json
+or a few poles only evaluates the new or changed spans.
+
+Files are touched on every hit; when the directory exceeds
+its size limit the least recently used entries are removed.
+=========================================================
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from common.cloud_cache import source_fingerprint
+
+DEFAULT_MAX_MB = 256
+CACHE_VERSION = 1
+
+
+def cloud_fingerprint(cloud):
+    """
+    Fingerprint of the input cloud, including the point order of its view
+    (the columnar cache sorts points by label, so indices differ).
+    """
+    meta = getattr(cloud, "meta", None)
+    fp = meta["fingerprint"] if meta else source_fingerprint(cloud.path)
+    return f"{type(cloud).__name__}:{fp}"
+
+
+# =========================================================
+# SERIALIZATION
+# =========================================================
+def _fases_to_arrays(prefix, fases, out):
+    idx = [np.asarray(i, dtype=np.int64) for i, _ in fases]
+    out[f"{prefix}/indptr"] = np.concatenate([[0], np.cumsum([len(i) for i in idx])])
+    out[f"{prefix}/indices"] = np.concatenate(idx) if idx else np.zeros(0, np.int64)
+    clases = [list(c.items()) for _, c in fases]
+    out[f"{prefix}/cls_ptr"] = np.concatenate([[0], np.cumsum([len(c) for c in clases])])
+    flat = [kv for c in clases for kv in c]
+    out[f"{prefix}/cls"] = np.array([k for k, _ in flat], dtype=np.int64)
+    out[f"{prefix}/counts"] = np.array([v for _, v in flat], dtype=np.int64)
+
+
+def _fases_from_arrays(prefix, data):
+    indptr, indices = data[f"{prefix}/indptr"], data[f"{prefix}/indices"]
+    cls_ptr, cls, counts = data[f"{prefix}/cls_ptr"], data[f"{prefix}/cls"], data[f"{prefix}/counts"]
+    fases = []
+    for k in range(len(indptr) - 1):
+        a, b = cls_ptr[k], cls_ptr[k + 1]
+        conteo = {int(c): int(n) for c, n in zip(cls[a:b], counts[a:b])}
+        fases.append((indices[indptr[k]:indptr[k + 1]], conteo))
+    return fases
+
+
+def resultado_to_arrays(resultado):
+    out = {}
+    _fases_to_arrays("fases", resultado["fases"], out)
+    radii = sorted(resultado["radii"])
+    out["radii"] = np.array(radii, dtype=np.float64)
+    for i, r in enumerate(radii):
+        _fases_to_arrays(f"radii{i}", resultado["radii"][r], out)
+    if resultado["class_radii"] is not None:
+        _fases_to_arrays("class_radii", resultado["class_radii"], out)
+    if resultado["hist"] is not None:
+        hist = resultado["hist"]
+        out["hist/cls"] = np.array(list(hist), dtype=np.int64)
+        out["hist/counts"] = np.array([hist[c] for c in hist], dtype=np.int64)
+    return out
+
+
+def resultado_from_arrays(data):
+    radii = [float(r) for r in data["radii"]]
+    hist = None
+    if "hist/cls" in data:
+        hist = {int(c): row for c, row in zip(data["hist/cls"], data["hist/counts"])}
+    return {
+        "fases": _fases_from_arrays("fases", data),
+        "radii": {r: _fases_from_arrays(f"radii{i}", data) for i, r in enumerate(radii)},
+        "class_radii": (
+            _fases_from_arrays("class_radii", data) if "class_radii/indptr" in data else None
+        ),
+        "hist": hist,
+    }
+
+
+# =========================================================
+# CACHE
+# =========================================================
+class SpanCache:
+    """
+    Directory of per-span results with LRU eviction.
+    """
+
+    def __init__(self, directory, context, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.context = json.dumps({"version": CACHE_VERSION, **context}, sort_keys=True)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, p1, p2):
+        h = hashlib.sha1(self.context.encode())
+        h.update(json.dumps([[float(v) for v in p1], [float(v) for v in p2]]).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                resultado = resultado_from_arrays({k: data[k] for k in data.files})
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # most recently used
+        self.hits += 1
+        return resultado
+
+    def put(self, key, resultado):
+        path = self._path(key)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **resultado_to_arrays(resultado))
+        os.replace(tmp, path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits its limit.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime_ns, st.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+            removed += 1
+        return removed
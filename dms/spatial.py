@@ -0,0 +1,266 @@
+"""
+=========================================================
+Spatial indexes for tube and envelope queries.
+
+GridIndex buckets the cloud into square XY cells. A span query
+only visits the cells touched by the XY footprint of its
+cylinder and runs the exact distance test on those candidates.
+The index is built once per cloud and shared by tube.py and
+split.py (in memory, and on disk next to the columnar cache).
+
+query_segments_kdtree answers all spans at once over a scipy
+cKDTree and returns CSR-style point indices per segment.
+=========================================================
+"""
+
+import os
+import numpy as np
+
+from dms.geometry import puntos_en_cilindro, distancia_a_segmento_2d
+
+DEFAULT_CELL_SIZE = 5.0
+
+
+def ranges_to_indices(starts, stops):
+    """
+    Concatenation of arange(start, stop) for every range, vectorized.
+    """
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    shift = np.repeat(starts - (ends - lengths), lengths)
+    return np.arange(total, dtype=np.int64) + shift
+
+
+class GridIndex:
+    """
+    2D bucket index over (N,3) points: points sorted by XY cell key.
+    """
+
+    def __init__(self, points, cell_size=DEFAULT_CELL_SIZE, tables=None):
+        self.points = points
+        self.cell_size = float(cell_size)
+        if tables is None:
+            tables = self.build_tables(points, self.cell_size)
+        self.origin_xy = tables["origin_xy"]
+        self.shape = tables["shape"]
+        self.order = tables["order"]
+        self.cell_keys = tables["cell_keys"]
+        self.cell_starts = tables["cell_starts"]
+        self.cell_stops = tables["cell_stops"]
+
+    @staticmethod
+    def build_tables(points, cell_size):
+        n = len(points)
+        if n == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return {
+                "origin_xy": np.zeros(2), "shape": np.ones(2, dtype=np.int64),
+                "order": empty, "cell_keys": empty,
+                "cell_starts": empty, "cell_stops": empty,
+            }
+        origin_xy = np.array([np.min(points[:, 0]), np.min(points[:, 1])], dtype=np.float64)
+        ij = np.floor((points[:, :2] - origin_xy) / cell_size).astype(np.int64)
+        shape = ij.max(axis=0) + 1
+        keys = ij[:, 0] * shape[1] + ij[:, 1]
+        del ij
+        order = np.argsort(keys, kind="stable")
+        cell_keys, cell_starts = np.unique(keys[order], return_index=True)
+        cell_stops = np.append(cell_starts[1:], n)
+        return {
+            "origin_xy": origin_xy, "shape": shape, "order": order,
+            "cell_keys": cell_keys, "cell_starts": cell_starts, "cell_stops": cell_stops,
+        }
+
+    @property
+    def tables(self):
+        return {
+            "origin_xy": self.origin_xy, "shape": self.shape, "order": self.order,
+            "cell_keys": self.cell_keys, "cell_starts": self.cell_starts,
+            "cell_stops": self.cell_stops,
+        }
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path):
+        np.savez(path, cell_size=self.cell_size, **self.tables)
+
+    @classmethod
+    def load(cls, path, points):
+        data = np.load(path)
+        tables = {k: data[k] for k in data.files if k != "cell_size"}
+        return cls(points, float(data["cell_size"]), tables)
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def cells_for_segment(self, p1, p2, radius):
+        """
+        Keys of the occupied cells within `radius` (in XY) of segment p1-p2.
+        """
+        a = np.asarray(p1, dtype=np.float64)[:2]
+        b = np.asarray(p2, dtype=np.float64)[:2]
+        lo = np.floor((np.minimum(a, b) - radius - self.origin_xy) / self.cell_size).astype(np.int64)
+        hi = np.floor((np.maximum(a, b) + radius - self.origin_xy) / self.cell_size).astype(np.int64)
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, self.shape - 1)
+        if np.any(hi < lo):
+            return np.zeros(0, dtype=np.int64)
+
+        ii, jj = np.meshgrid(
+            np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing="ij"
+        )
+        ii, jj = ii.ravel(), jj.ravel()
+        centers = self.origin_xy + (np.column_stack([ii, jj]) + 0.5) * self.cell_size
+        reach = radius + self.cell_size * np.sqrt(0.5)
+        near = distancia_a_segmento_2d(centers, a, b) <= reach
+        return ii[near] * self.shape[1] + jj[near]
+
+    def candidates_in_cells(self, keys):
+        """
+        Point indices stored in the given cells.
+        """
+        if len(self.cell_keys) == 0 or len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        pos = pos[self.cell_keys[pos] == keys]
+        return self.order[ranges_to_indices(self.cell_starts[pos], self.cell_stops[pos])]
+
+    def candidates(self, p1, p2, radius):
+        return self.candidates_in_cells(self.cells_for_segment(p1, p2, radius))
+
+    def query_cylinder(self, p1, p2, radius):
+        """
+        Same result as puntos_en_cilindro(points, p1, p2, radius), visiting
+        only nearby cells.
+        """
+        cand = self.candidates(p1, p2, radius)
+        if len(cand) == 0:
+            return cand
+        cand = np.sort(cand)
+        return cand[puntos_en_cilindro(self.points[cand], p1, p2, radius)]
+
+    def query_cylinders(self, p1s, p2s, radius):
+        """
+        query_cylinder for many segments at once. The cells touched by all
+        segments are gathered a single time, so overlapping cylinders (adjacent
+        spans) share their candidates instead of reading them again.
+
+        Returns:
+            list of sorted index arrays, one per segment
+        """
+        cells = [self.cells_for_segment(a, b, radius) for a, b in zip(p1s, p2s)]
+        if not cells:
+            return []
+        all_keys = np.unique(np.concatenate(cells))
+        present = np.isin(all_keys, self.cell_keys)
+        all_keys = all_keys[present]
+
+        # Candidates of every touched cell, gathered once (cell-major)
+        pos = np.searchsorted(self.cell_keys, all_keys)
+        starts, stops = self.cell_starts[pos], self.cell_stops[pos]
+        cand = self.order[ranges_to_indices(starts, stops)]
+        cand_pts = self.points[cand]
+        offsets = np.concatenate([[0], np.cumsum(stops - starts)])
+
+        resultado = []
+        for (a, b), keys in zip(zip(p1s, p2s), cells):
+            k = np.searchsorted(all_keys, keys)
+            k = k[(k < len(all_keys)) & (all_keys[np.minimum(k, len(all_keys) - 1)] == keys)]
+            local = ranges_to_indices(offsets[k], offsets[k + 1])
+            inside = local[puntos_en_cilindro(cand_pts[local], a, b, radius)]
+            resultado.append(np.sort(cand[inside]))
+        return resultado
+
+
+def shared_grid_index(cloud, frame, cell_size=DEFAULT_CELL_SIZE, exclude=None):
+    """
+    Grid index over the cloud in the working coordinates of `frame`,
+    optionally without the points whose label is in `exclude`.
+    Built once per cloud and reused by every stage of the process; when the
+    cloud comes from the columnar cache the tables are also saved on disk.
+    The labels of the indexed points are kept in `index.labels`.
+    """
+    exclude = None if exclude is None else sorted({int(v) for v in exclude})
+    key = (float(cell_size), tuple(frame.origin), str(frame.dtype), tuple(exclude or ()))
+    shared = getattr(cloud, "_grid_indexes", None)
+    if shared is None:
+        shared = cloud._grid_indexes = {}
+    if key in shared:
+        return shared[key]
+
+    if exclude:
+        # Columnar cache: only the kept label ranges are read
+        points, labels = cloud.select(exclude=exclude, frame=frame)
+    else:
+        points, labels = cloud.stack_xyz(frame=frame), cloud.labels
+    path = None
+    if getattr(cloud, "directory", None):
+        tag = "_".join(f"{v:g}" for v in frame.origin)
+        if exclude:
+            tag += "_x" + "-".join(map(str, exclude))
+        path = os.path.join(cloud.directory, f"grid_{cell_size:g}m_{tag}_{frame.dtype}.npz")
+
+    if path and os.path.exists(path):
+        index = GridIndex.load(path, points)
+    else:
+        index = GridIndex(points, cell_size)
+        if path:
+            index.save(path)
+    index.labels = None if labels is None else np.asarray(labels)
+
+    shared[key] = index
+    return index
+
+
+# =========================================================
+# KD-TREE BATCH QUERY
+# =========================================================
+def query_segments_kdtree(tree, points, p1s, p2s, radius, workers=-1):
+    """
+    Points inside the cylinder of every segment, in one batched call.
+
+    Each segment is covered with balls centred along its axis (spacing =
+    radius, ball radius = sqrt(r² + (spacing/2)²)), all balls are queried at
+    once on the cKDTree and the candidates are then filtered exactly.
+
+    Args:
+        tree: scipy.spatial.cKDTree built over `points`
+        p1s, p2s: (M,3) segment endpoints
+        radius: scalar or (M,) radii
+    Returns:
+        indptr (M+1), indices: CSR layout, indices of segment m are
+        indices[indptr[m]:indptr[m+1]] (sorted)
+    """
+    p1s = np.asarray(p1s, dtype=np.float64).reshape(-1, 3)
+    p2s = np.asarray(p2s, dtype=np.float64).reshape(-1, 3)
+    m = len(p1s)
+    radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), (m,))
+
+    lengths = np.linalg.norm(p2s - p1s, axis=1)
+    n_balls = np.maximum(np.ceil(lengths / np.maximum(radii, 1e-6)).astype(np.int64), 0) + 1
+    seg_of_ball = np.repeat(np.arange(m), n_balls)
+    first_ball = np.concatenate([[0], np.cumsum(n_balls)[:-1]])
+    step_id = np.arange(len(seg_of_ball)) - first_ball[seg_of_ball]
+    t = step_id / np.maximum(n_balls[seg_of_ball] - 1, 1)
+    centers = p1s[seg_of_ball] + t[:, None] * (p2s - p1s)[seg_of_ball]
+    spacing = lengths / np.maximum(n_balls - 1, 1)
+    ball_r = np.sqrt(radii ** 2 + (spacing / 2.0) ** 2)[seg_of_ball]
+
+    hits = tree.query_ball_point(centers, ball_r, workers=workers, return_sorted=False)
+
+    indptr = np.zeros(m + 1, dtype=np.int64)
+    parts = []
+    for s in range(m):
+        lists = hits[first_ball[s]:first_ball[s] + n_balls[s]]
+        cand = np.unique(np.concatenate([np.asarray(h, dtype=np.int64) for h in lists]))
+        if len(cand):
+            cand = cand[puntos_en_cilindro(points[cand], p1s[s], p2s[s], radii[s])]
+        parts.append(cand)
+        indptr[s + 1] = indptr[s] + len(cand)
+
+    indices = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    return indptr, indices
@@ -1,16 +1,26 @@
-import open3d as o3d
 import numpy as np
-import pandas as pd
 import json
 import os
-from plyfile import PlyData, PlyElement
+import time
+from contextlib import ExitStack
+
+from common.pointcloud import load_pointcloud
+from common.coords import frame_from_config, CoordinateFrame
+from common.pole_table import load_pole_table
+from dms.spatial import shared_grid_index, DEFAULT_CELL_SIZE
+from common.ply_writer import write_ply
+from common.write_queue import BoundedWriter
+from common.extract_archive import ExtractArchiveWriter, ARCHIVE_FILE, DEFAULT_SCALE
+from dms.sampling import muestrear_cilindro, muestrear_partes
 
 from rebuild.rebuild_poles_MT import (
-    reconstruct_poles,
+    pole_parts,
     compute_average_pole_height,
     crossarm_spacing,
-    crossarm_radius
+    crossarm_radius,
+    num_crossarms
 )
+from dms.collision import fases_z
 
 # =========================
 # LOAD CONFIG
@@ -22,9 +32,19 @@ ply_path = cfg["input_ply"]
 csv_path = cfg["csv_poles_MT"]
 collision_dir = cfg.get("collisions_dir", "output/collisions")
 collision_report_path = os.path.join(collision_dir, "collision_report.json")
+cache_dir = cfg.get("cache_dir")
 
 tube_radius = cfg["tube"].get("default_radius", 4.0)
-resol_cilindro = cfg["tube"].get("resolution", 18)
+grid_cell_size = cfg["tube"].get("grid_cell_size", DEFAULT_CELL_SIZE)
+num_phases = cfg["tube"].get("num_phases", num_crossarms)
+
+split_cfg = cfg.get("split", {})
+colors_uint8 = split_cfg.get("colors_uint8", False)
+write_workers = split_cfg.get("write_workers", 2)
+max_pending = split_cfg.get("max_pending", 4)  # extracts held in memory at most
+output_format = split_cfg.get("output_format", "ply")  # "ply" | "archive" | "both"
+archive_scale = split_cfg.get("archive_scale", DEFAULT_SCALE)
+envelope_batch = max(1, split_cfg.get("envelope_batch", 16))  # adjacent spans per envelope query
 
 # Envelope
 envolvente_radius = 60
@@ -36,92 +56,79 @@ COLOR_POLE = [1, 0, 1]
 
 os.makedirs(collision_dir, exist_ok=True)
 
+# Surface samples per extract
+N_POLE_SAMPLES = 8000
+N_TUBE_SAMPLES = 6000
+SAMPLE_SEED = 0
+
 # =========================
-# GEOMETRY UTILS
+# SURFACE SAMPLES
 # =========================
-def rotar_de_a_b(a, b):
-    a = np.array(a) / np.linalg.norm(a)
-    b = np.array(b) / np.linalg.norm(b)
-    v = np.cross(a, b)
-    c = np.dot(a, b)
-    if np.linalg.norm(v) < 1e-6:
-        return np.eye(3)
-    s = np.linalg.norm(v)
-    k = np.array([
-        [0, -v[2], v[1]],
-        [v[2], 0, -v[0]],
-        [-v[1], v[0], 0]
-    ])
-    return np.eye(3) + k + k @ k * ((1 - c) / (s ** 2))
-
-def crear_cilindro_entre(p1, p2, radio):
-    p1, p2 = np.array(p1), np.array(p2)
-    vec = p2 - p1
-    L = np.linalg.norm(vec)
-    if L < 1e-6:
-        return None
-
-    cyl = o3d.geometry.TriangleMesh.create_cylinder(
-        radius=radio,
-        height=L,
-        resolution=resol_cilindro
-    )
-    R = rotar_de_a_b([0, 0, 1], vec)
-    cyl.rotate(R, center=(0, 0, 0))
-    cyl.translate((p1 + p2) / 2)
-    cyl.paint_uniform_color(COLOR_TUBE_COLLISION)
-    cyl.compute_vertex_normals()
-    return cyl
-
-def puntos_en_cilindro(pts, p1, p2, radius):
-    p1, p2 = np.array(p1), np.array(p2)
-    v = p2 - p1
-    L = np.linalg.norm(v)
-    if L < 1e-6:
-        return np.array([], dtype=int)
-
-    u = v / L
-    rel = pts - p1
-    proj = np.dot(rel, u)
-    mask_l = (proj >= 0) & (proj <= L)
-    closest = p1 + np.outer(proj, u)
-    dist = np.linalg.norm(pts - closest, axis=1)
-
-    return np.where(mask_l & (dist <= radius))[0]
-
-def mesh_to_points(mesh, n, class_id, color):
-    pcd = mesh.sample_points_uniformly(n)
-    pts = np.asarray(pcd.points)
+def etiquetar(pts, class_id, color):
     cols = np.tile(color, (len(pts), 1))
     lbls = np.full(len(pts), class_id, dtype=np.int32)
     return pts, cols, lbls
 
-def guardar_ply(path, pts, cols, lbls):
-    n = min(len(pts), len(cols), len(lbls))
-    v = np.array([
-        (*pts[i], cols[i][0], cols[i][1], cols[i][2], int(lbls[i]))
-        for i in range(n)
-    ], dtype=[
-        ('x', 'f4'), ('y', 'f4'), ('z', 'f4'),
-        ('red', 'f4'), ('green', 'f4'), ('blue', 'f4'),
-        ('class', 'i4')
-    ])
-    PlyData([PlyElement.describe(v, 'vertex')]).write(path)
-
-def load_pointcloud_raw(path):
-    ply = PlyData.read(path)
-    v = ply["vertex"].data
-    pts = np.vstack([v["x"], v["y"], v["z"]]).T
-
-    if all(c in v.dtype.names for c in ("red", "green", "blue")):
-        cols = np.vstack([v["red"], v["green"], v["blue"]]).T
-        if cols.max() > 1.0:
-            cols = cols / 255.0
-    else:
+def muestras_poste(pid, polos, height, cache):
+    """
+    Surface samples of one pole, generated once per Pole_ID and run.
+    """
+    if pid not in cache:
+        rng = np.random.default_rng([SAMPLE_SEED, pid])
+        r = polos.row(pid)
+        partes = pole_parts(
+            polos["Center_X"][r], polos["Center_Y"][r], polos["Base_Z"][r], height, polos["Type"][r]
+        )
+        cache[pid] = etiquetar(muestrear_partes(partes, N_POLE_SAMPLES, rng), 7, COLOR_POLE)
+    return cache[pid]
+
+def envolventes_por_lotes(index, frame, trabajos, radius, batch):
+    """
+    Envelope indices of every job, in order. Adjacent spans are queried
+    together, `batch` at a time, so they share their candidates while only
+    one batch of envelopes is held in memory.
+    """
+    for i in range(0, len(trabajos), batch):
+        lote = trabajos[i:i + batch]
+        yield from index.query_cylinders(
+            [frame.to_local(t[3]) for t in lote],
+            [frame.to_local(t[4]) for t in lote],
+            radius
+        )
+
+def informe_escritura(titulo, tiempos, compute_s):
+    """
+    One line per written extract; tiempos[i] belongs to extract i.
+    """
+    if tiempos:
+        print(titulo)
+    for i, t in enumerate(tiempos):
+        print(
+            f"[OK] {t['path']}  compute {compute_s[i]:.2f} s | wait {t['blocked_s']:.2f} s"
+            f" | queued {t['queued_s']:.2f} s | write {t['write_s']:.2f} s"
+            f" | {t['bytes'] / 1e6:.1f} MB"
+        )
+
+def guardar_ply(path, pts, cols, lbls, colors_uint8=False, coord_dtype="f4"):
+    write_ply(path, pts, cols, lbls, colors_uint8=colors_uint8, coord_dtype=coord_dtype)
+
+def load_pointcloud_raw(path, cache_dir=None, frame=None):
+    """
+    Returns the raw cloud (points, colors, labels) and its XY grid index.
+    The points are the ones indexed by the grid (shared with tube.py).
+    """
+    cloud = load_pointcloud(path, cache_dir=cache_dir)
+    index = shared_grid_index(cloud, frame or CoordinateFrame(), grid_cell_size)
+    pts = index.points
+
+    cols = cloud.colors
+    if cols is None:
         cols = np.full((len(pts), 3), 0.6)
 
-    lbls = v["class"] if "class" in v.dtype.names else np.zeros(len(pts), dtype=np.int32)
-    return pts, cols, lbls
+    lbls = cloud.labels
+    if lbls is None:
+        lbls = np.zeros(len(pts), dtype=np.int32)
+    return pts, cols, lbls, index
 
 # =========================
 # MAIN
@@ -130,8 +137,9 @@ if __name__ == "__main__":
 
     print("\n📥 Extracting collision PLYs (3 tubes per span)...")
 
-    pts, cols, lbls = load_pointcloud_raw(ply_path)
-    df = pd.read_csv(csv_path)
+    frame = frame_from_config(cfg, cloud=load_pointcloud(ply_path, cache_dir=cache_dir))
+    pts, cols, lbls, index = load_pointcloud_raw(ply_path, cache_dir, frame)
+    polos = load_pole_table(csv_path)
 
     with open(collision_report_path) as f:
         reporte = json.load(f)
@@ -139,72 +147,95 @@ if __name__ == "__main__":
     # --- uniform height ---
     uniform_height = compute_average_pole_height(csv_path)
 
-    # --- rebuild poles ---
-    pole_geoms = reconstruct_poles(uniform_height)
+    z_offsets = fases_z(num_phases, crossarm_spacing, crossarm_radius)
+    rng = np.random.default_rng(SAMPLE_SEED)
+    poles_cache = {}
 
-    pole_meshes = {}
-    idx = 0
-    for _, r in df.iterrows():
-        pid = int(r["Pole_ID"])
-        mesh = o3d.geometry.TriangleMesh()
-        for _ in range(4):  # poste + 3 crucetas
-            mesh += pole_geoms[idx]
-            idx += 1
-        mesh.compute_vertex_normals()
-        pole_meshes[pid] = mesh
+    # --- tubes and environment envelope of every collision ---
+    colisiones = reporte.get("collisions", [])
+    P1 = polos.top_points(polos.rows([c["from_pole"] for c in colisiones]), uniform_height)
+    P2 = polos.top_points(polos.rows([c["to_pole"] for c in colisiones]), uniform_height)
 
-    cid = 1
-    for col in reporte.get("collisions", []):
+    trabajos = []
+    for i, col in enumerate(colisiones):
 
         fr, to = col["from_pole"], col["to_pole"]
-        pf = df[df["Pole_ID"] == fr].iloc[0]
-        pt = df[df["Pole_ID"] == to].iloc[0]
 
-        # --- 3 crossarms ---
-        z_offsets = [
-            -crossarm_radius,
-            -crossarm_radius - crossarm_spacing,
-            -crossarm_radius - 2 * crossarm_spacing
-        ]
-
-        tubos = []
+        # one tube per crossarm
+        segmentos = []
         for dz in z_offsets:
-            p1 = [
-                pf["Center_X"], pf["Center_Y"],
-                pf["Base_Z"] + uniform_height + dz
-            ]
-            p2 = [
-                pt["Center_X"], pt["Center_Y"],
-                pt["Base_Z"] + uniform_height + dz
-            ]
-            tubos.append(crear_cilindro_entre(p1, p2, tube_radius))
-
-        # --- environment envelope ---
+            p1 = P1[i] + np.array([0.0, 0.0, dz])
+            p2 = P2[i] + np.array([0.0, 0.0, dz])
+            segmentos.append((p1, p2))
+
         v = np.array(p2) - np.array(p1)
         u = v / np.linalg.norm(v)
         p1e = np.array(p1) - u * envolvente_extension
         p2e = np.array(p2) + u * envolvente_extension
-
-        idx_env = puntos_en_cilindro(pts, p1e, p2e, envolvente_radius)
-        ent_pts, ent_cols, ent_lbls = pts[idx_env], cols[idx_env], lbls[idx_env]
-
-        pA, cA, lA = mesh_to_points(pole_meshes[fr], 8000, 7, COLOR_POLE)
-        pB, cB, lB = mesh_to_points(pole_meshes[to], 8000, 7, COLOR_POLE)
-
-        tpts, tcols, tlbls = [], [], []
-        for t in tubos:
-            p, c, l = mesh_to_points(t, 6000, 14, COLOR_TUBE_COLLISION)
-            tpts.append(p)
-            tcols.append(c)
-            tlbls.append(l)
-
-        Fpts = np.vstack([ent_pts, pA, pB] + tpts)
-        Fcols = np.vstack([ent_cols, cA, cB] + tcols)
-        Flbls = np.hstack([ent_lbls, lA, lB] + tlbls)
-
-        out = os.path.join(collision_dir, f"collision_extract_{cid}.ply")
-        guardar_ply(out, Fpts, Fcols, Flbls)
-        print(f"[OK] {out}")
-        cid += 1
+        trabajos.append((fr, to, segmentos, p1e, p2e))
+
+    # --- envelopes resolved batch by batch as the loop consumes them ---
+    envolventes = envolventes_por_lotes(index, frame, trabajos, envolvente_radius, envelope_batch)
+
+    # --- compute extracts while bounded pools write the finished ones ---
+    escribir_ply = output_format in ("ply", "both")
+    escribir_archivo = output_format in ("archive", "both")
+    archive_path = os.path.join(collision_dir, ARCHIVE_FILE)
+    tiempos_ply, tiempos_archivo, compute_s = [], [], []
+    t_start = time.perf_counter()
+
+    # Leaving the block waits for the pools; on error the partial archive is removed
+    with ExitStack() as stack:
+        writer = archive_writer = None
+        if escribir_ply:
+            writer = stack.enter_context(BoundedWriter(write_workers, max_pending))
+        if escribir_archivo:
+            archive = stack.enter_context(ExtractArchiveWriter(archive_path, archive_scale))
+            # Extracts are appended in order by a single writer thread
+            archive_writer = stack.enter_context(BoundedWriter(1, max_pending))
+
+        for cid, ((fr, to, segmentos, _, _), idx_env) in enumerate(zip(trabajos, envolventes), start=1):
+
+            t0 = time.perf_counter()
+            ent_pts, ent_cols, ent_lbls = frame.to_global(pts[idx_env]), cols[idx_env], lbls[idx_env]
+
+            pA, cA, lA = muestras_poste(fr, polos, uniform_height, poles_cache)
+            pB, cB, lB = muestras_poste(to, polos, uniform_height, poles_cache)
+
+            tpts, tcols, tlbls = [], [], []
+            for p1, p2 in segmentos:
+                p, c, l = etiquetar(
+                    muestrear_cilindro(p1, p2, tube_radius, N_TUBE_SAMPLES, rng),
+                    14, COLOR_TUBE_COLLISION
+                )
+                tpts.append(p)
+                tcols.append(c)
+                tlbls.append(l)
+
+            Fpts = np.vstack([ent_pts, pA, pB] + tpts)
+            Fcols = np.vstack([ent_cols, cA, cB] + tcols)
+            Flbls = np.hstack([ent_lbls, lA, lB] + tlbls)
+
+            compute_s.append(time.perf_counter() - t0)
+
+            name = f"collision_extract_{cid}"
+            if writer is not None:
+                writer.submit(
+                    os.path.join(collision_dir, f"{name}.ply"),
+                    guardar_ply, Fpts, Fcols, Flbls, colors_uint8, frame.ply_coord_dtype
+                )
+            if archive_writer is not None:
+                archive_writer.submit(name, archive.add, Fpts, Fcols, Flbls)
+
+        if writer is not None:
+            tiempos_ply = writer.close()
+        if archive_writer is not None:
+            tiempos_archivo = archive_writer.close()
+
+    informe_escritura("💾 PLY writes:", tiempos_ply, compute_s)
+    if escribir_archivo:
+        informe_escritura(f"💾 {ARCHIVE_FILE} writes:", tiempos_archivo, compute_s)
+        print(f"🗜️ Archive: {archive_path} ({os.path.getsize(archive_path) / 1e6:.1f} MB)")
+    print(f"⏱️ Split stage: {time.perf_counter() - t_start:.2f} s")
 
     print("\n✅ Collision extraction completed.")
\ No newline at end of file
@@ -1,18 +1,42 @@
 import open3d as o3d
 import numpy as np
-import pandas as pd
 import json
 import os
 import argparse
-from collections import Counter
-from plyfile import PlyData
+
+from common.pointcloud import load_pointcloud
+from common.coords import frame_from_config
+from common.pole_table import load_pole_table
+from common.workers import resolve_workers
+from dms.spatial import GridIndex, shared_grid_index, DEFAULT_CELL_SIZE
+from dms.span_cache import SpanCache, cloud_fingerprint, DEFAULT_MAX_MB
+from dms.clearance import (
+    ClearanceIndex,
+    puntos_corredor,
+    perfiles_holgura,
+    resumen_holgura,
+    guardar_perfiles,
+    PROFILES_FILE
+)
+from dms.collision import (
+    Criterios,
+    fases_z,
+    candidatos_grid,
+    candidatos_kdtree,
+    evaluar_tramo,
+    evaluar_tramos_paralelo,
+    colisiones_por_tramo,
+    histogramas_por_tramo,
+    instancias_obstaculo
+)
 
 from rebuild.rebuild_poles_MT import (
     load_and_color_pointcloud,
     reconstruct_poles,
     compute_average_pole_height,
     crossarm_spacing,
-    crossarm_radius
+    crossarm_radius,
+    num_crossarms
 )
 
 # =========================
@@ -28,6 +52,7 @@ PLY_PATH = os.path.join(BASE_DIR, config["input_ply"])
 CSV_PATH = os.path.join(BASE_DIR, config["csv_poles_MT"])
 CONNECTIONS_PATH = os.path.join(BASE_DIR, "output/connections.json")
 COLLISIONS_DIR = os.path.join(BASE_DIR, config["collisions_dir"])
+CACHE_DIR = os.path.join(BASE_DIR, config["cache_dir"]) if config.get("cache_dir") else None
 os.makedirs(COLLISIONS_DIR, exist_ok=True)
 
 # =========================
@@ -38,14 +63,30 @@ DEFAULT_RADIUS = tube_cfg["default_radius"]
 color_tubo = tube_cfg["color"]
 resol_cilindro = tube_cfg["resolution"]
 min_points_collision = tube_cfg["min_points_collision"]
+grid_cell_size = tube_cfg.get("grid_cell_size", DEFAULT_CELL_SIZE)
+spatial_index = tube_cfg.get("spatial_index", "grid")  # "grid" | "kdtree"
+num_phases = tube_cfg.get("num_phases", num_crossarms)  # 2-, 3- or 4-phase lines
+DEFAULT_WORKERS = tube_cfg.get("workers", 1)
+DEFAULT_RADII = tube_cfg.get("radii", [])             # extra radii, same pass
+class_radii = tube_cfg.get("class_radii", {})         # {"class_id": radius}
+histogram_step = tube_cfg.get("histogram_step", 0.5)  # metres per bin, null = off
+span_cache_cfg = tube_cfg.get("span_cache", {})
+clearance_cfg = tube_cfg.get("clearance", {})
+instances_cfg = tube_cfg.get("instances", {})
+SPAN_CACHE_DIR = os.path.join(BASE_DIR, config.get("output_dir", "output"), "span_cache")
 
 # =========================
 # CLI ARGUMENTS
 # =========================
 parser = argparse.ArgumentParser()
 parser.add_argument("--radius", type=float)
+parser.add_argument("--workers", type=int, help="Processes for collision detection (0 = all cores)")
+parser.add_argument("--radii", type=float, nargs="+", help="Extra radii reported in the same pass")
+parser.add_argument("--no-cache", action="store_true", help="Recompute every span")
 args = parser.parse_args()
 tube_radius = args.radius if args.radius else DEFAULT_RADIUS
+radii = args.radii if args.radii else DEFAULT_RADII
+workers = resolve_workers(args.workers if args.workers is not None else DEFAULT_WORKERS)
 
 # =========================
 # CLASS NAMES
@@ -68,20 +109,6 @@ REMOVE_CLASSES = [0, 6, config["label_MT"], 9]
 # =========================
 # GEOMETRY UTILS
 # =========================
-def puntos_en_cilindro(points, p1, p2, radius):
-    p1, p2 = np.array(p1), np.array(p2)
-    axis = p2 - p1
-    L = np.linalg.norm(axis)
-    if L < 1e-6:
-        return np.array([], dtype=int)
-    axis_u = axis / L
-    vecs = points - p1
-    proj = np.dot(vecs, axis_u)
-    mask = (proj >= 0) & (proj <= L)
-    closest = p1 + np.outer(proj, axis_u)
-    dist = np.linalg.norm(points - closest, axis=1)
-    return np.where(mask & (dist <= radius))[0]
-
 def rotar_de_a_b(a, b):
     a, b = np.array(a)/np.linalg.norm(a), np.array(b)/np.linalg.norm(b)
     v = np.cross(a, b)
@@ -123,76 +150,177 @@ if __name__ == "__main__":
 
     nube = load_and_color_pointcloud()
 
-    ply = PlyData.read(PLY_PATH)["vertex"].data
-    pts = np.vstack([ply["x"], ply["y"], ply["z"]]).T
-    labels = np.array(ply["class"])
-    mask = ~np.isin(labels, REMOVE_CLASSES)
-    pts, labels = pts[mask], labels[mask]
+    # Same mapping as the rebuild stage: the PLY is not parsed again
+    cloud = load_pointcloud(PLY_PATH, cache_dir=CACHE_DIR)
+    frame = frame_from_config(config, cloud=cloud)
+
+    # Only the obstacle classes are gathered (kept label ranges of the cache)
+    index = None
+    if spatial_index == "kdtree" or workers > 1:
+        pts, labels = cloud.select(exclude=REMOVE_CLASSES, frame=frame)
+    else:
+        # XY grid over the filtered points, saved next to the cache
+        index = shared_grid_index(cloud, frame, grid_cell_size, exclude=REMOVE_CLASSES)
+        pts, labels = index.points, index.labels
+    labels = np.asarray(labels)
 
-    df = pd.read_csv(CSV_PATH)
     with open(CONNECTIONS_PATH) as f:
         conexiones = json.load(f)
 
-    polos = {int(r["Pole_ID"]): r for _, r in df.iterrows()}
+    polos = load_pole_table(CSV_PATH)
     uniform_height = compute_average_pole_height(CSV_PATH)
 
     geometries = [nube]
     geometries += reconstruct_poles(uniform_height)
 
-    conexiones_dict = {}
+    # Top of each span (phase 0 reference); each phase is a Z offset
+    dz_fases = fases_z(num_phases, crossarm_spacing, crossarm_radius)
+    mallas = {}
+    tramos = []
 
-    for c in conexiones:
-        key = (c["from_id"], c["to_id"])
-        conexiones_dict.setdefault(key, [])
+    P1 = polos.top_points(polos.rows([c["from_id"] for c in conexiones]), uniform_height)
+    P2 = polos.top_points(polos.rows([c["to_id"] for c in conexiones]), uniform_height)
+    P1l, P2l = frame.to_local(P1), frame.to_local(P2)
 
-        pf, pt = polos[c["from_id"]], polos[c["to_id"]]
+    for i, c in enumerate(conexiones):
+        key = (c["from_id"], c["to_id"])
+        mallas.setdefault(key, [])
+        p1, p2 = P1[i], P2[i]
 
-        for i in range(3):
-            zf = pf["Base_Z"] + uniform_height - crossarm_radius - i*crossarm_spacing
-            zt = pt["Base_Z"] + uniform_height - crossarm_radius - i*crossarm_spacing
-            p1 = [pf["Center_X"], pf["Center_Y"], zf]
-            p2 = [pt["Center_X"], pt["Center_Y"], zt]
-            cyl = crear_cilindro_entre(p1, p2, tube_radius)
+        for dz in dz_fases:
+            cyl = crear_cilindro_entre(
+                [p1[0], p1[1], p1[2] + dz], [p2[0], p2[1], p2[2] + dz], tube_radius
+            )
             if cyl:
                 geometries.append(cyl)
-                conexiones_dict[key].append((p1, p2, cyl))
+                mallas[key].append(cyl)
+
+        tramos.append((key, P1l[i], P2l[i]))
+
+    segmentos = [(p1, p2) for _, p1, p2 in tramos]
+    claves = [key for key, _, _ in tramos]
+
+    # Every criterion is answered from one distance computation per span
+    criterios = Criterios(tube_radius, radii, class_radii, histogram_step)
+
+    # Reuse the results of unchanged spans
+    span_cache = None
+    por_tramo = [None] * len(segmentos)
+    if span_cache_cfg.get("enabled", True) and not args.no_cache:
+        span_cache = SpanCache(SPAN_CACHE_DIR, {
+            "cloud": cloud_fingerprint(cloud),
+            "frame": [frame.origin.tolist(), str(frame.dtype)],
+            "removed": REMOVE_CLASSES,
+            "points": "filtered",  # indices refer to the kept points only
+            "dz_fases": dz_fases,
+            "radius": criterios.radius,
+            "radii": criterios.radii,
+            "class_radii": criterios.class_radii,
+            "histogram_step": histogram_step,
+            "bin_edges": None if criterios.bin_edges is None else criterios.bin_edges.tolist(),
+            "min_points": min_points_collision,
+        }, span_cache_cfg.get("max_mb", DEFAULT_MAX_MB))
+        claves_cache = [span_cache.key(p1, p2) for p1, p2 in segmentos]
+        por_tramo = [span_cache.get(k) for k in claves_cache]
+
+    pendientes = [i for i, r in enumerate(por_tramo) if r is None]
+    seg_pend = [segmentos[i] for i in pendientes]
+
+    if not seg_pend:
+        nuevos = []
+    elif workers > 1:
+        # Spans fanned out to a process pool over shared-memory points
+        nuevos = evaluar_tramos_paralelo(
+            pts, labels, seg_pend, criterios, dz_fases,
+            workers, grid_cell_size
+        )
+    else:
+        # Candidates per span (one lookup for all its phases)
+        if spatial_index == "kdtree":
+            candidatos = candidatos_kdtree(
+                pts,
+                [p1 for p1, _ in seg_pend], [p2 for _, p2 in seg_pend],
+                criterios.max_radius, dz_fases
+            )
+        else:
+            candidatos = [
+                candidatos_grid(index, p1, p2, criterios.max_radius)
+                for p1, p2 in seg_pend
+            ]
+
+        # Single pass per span over its candidates
+        nuevos = [
+            evaluar_tramo(pts, labels, cand, p1, p2, dz_fases, criterios)
+            for (p1, p2), cand in zip(seg_pend, candidatos)
+        ]
+
+    for i, res in zip(pendientes, nuevos):
+        por_tramo[i] = res
+        if span_cache:
+            span_cache.put(claves_cache[i], res)
+
+    if span_cache:
+        span_cache.evict()
+        print(f"♻️ Span cache: {span_cache.hits} reused, {len(pendientes)} evaluated")
+
+    def colisiones(campo, radio=None):
+        return colisiones_por_tramo(
+            claves, por_tramo, campo, pts, frame,
+            min_points_collision, class_names, radio
+        )
 
     reporte = {"tube_radius": tube_radius, "collisions": []}
-    collision_id = 1
-
-    for (from_id, to_id), segmentos in conexiones_dict.items():
-        collision_map = {}
-        hay_colision = False
-
-        for p1, p2, mesh in segmentos:
-            idx = puntos_en_cilindro(pts, p1, p2, tube_radius)
-            if len(idx) < min_points_collision:
-                continue
-
-            hay_colision = True
-            conteo = Counter(labels[idx])
-
-            for cls, n in conteo.items():
-                if n < min_points_collision:
-                    continue
-                collision_map.setdefault(cls, {
-                    "object_class_id": int(cls),
-                    "object_class_name": class_names.get(cls, f"Unknown_{cls}"),
-                    "num_points": 0,
-                    "sample_point": pts[idx[0]].tolist()
-                })["num_points"] += int(n)
-
-        if hay_colision:
-            for _, _, mesh in segmentos:
-                mesh.paint_uniform_color([1,0,0])
-
-            reporte["collisions"].append({
-                "id": collision_id,
-                "from_pole": from_id,
-                "to_pole": to_id,
-                "collisions": list(collision_map.values())
-            })
-            collision_id += 1
+    reporte["collisions"], con_colision = colisiones("fases")
+
+    for key in con_colision:
+        for mesh in mallas[key]:
+            mesh.paint_uniform_color([1,0,0])
+
+    # Obstacle instances of every colliding span (voxel connected components)
+    if instances_cfg.get("enabled", True):
+        por_clave = {}
+        for key, seg, res in zip(claves, segmentos, por_tramo):
+            por_clave.setdefault(key, []).append((seg, res))
+
+        for entrada in reporte["collisions"]:
+            obstaculos = instancias_obstaculo(
+                pts, labels, por_clave[(entrada["from_pole"], entrada["to_pole"])],
+                dz_fases, frame, class_names,
+                instances_cfg.get("voxel_size", 0.5),
+                instances_cfg.get("min_points", 5)
+            )
+            entrada["num_obstacles"] = len(obstaculos)
+            entrada["obstacles"] = obstaculos
+
+    if criterios.radii:
+        reporte["by_radius"] = [
+            {"tube_radius": r, "collisions": colisiones("radii", r)[0]}
+            for r in criterios.radii
+        ]
+
+    if criterios.class_radii:
+        reporte["class_radii"] = {str(k): v for k, v in criterios.class_radii.items()}
+        reporte["by_class_radius"] = colisiones("class_radii")[0]
+
+    # Minimum clearance per class along every phase wire
+    if clearance_cfg.get("enabled", True):
+        max_distance = clearance_cfg.get("max_distance", 15.0)
+        if index is None:
+            index = GridIndex(pts, grid_cell_size)
+        # Trees over the span corridors only: queries stop at max_distance
+        corredor = puntos_corredor(index, segmentos, dz_fases, max_distance)
+        perfiles = perfiles_holgura(
+            ClearanceIndex(pts, labels, clearance_cfg.get("classes"), corredor),
+            segmentos, dz_fases,
+            clearance_cfg.get("station_spacing", 1.0),
+            max_distance
+        )
+        reporte["clearance"] = resumen_holgura(claves, perfiles, frame, class_names)
+        guardar_perfiles(os.path.join(COLLISIONS_DIR, PROFILES_FILE), claves, perfiles)
+
+    if criterios.bin_edges is not None:
+        with open(os.path.join(COLLISIONS_DIR, "distance_histograms.json"), "w") as f:
+            json.dump(histogramas_por_tramo(claves, por_tramo, criterios), f)
 
     with open(os.path.join(COLLISIONS_DIR, "collision_report.json"), "w") as f:
         json.dump(reporte, f, indent=4)
@@ -9,8 +9,13 @@ Now input file is read from config.json instead of CLI.
 import os
 import json
 import numpy as np
-from plyfile import PlyData
+from concurrent.futures import ThreadPoolExecutor
 
+from common.pointcloud import load_pointcloud
+from common.coords import frame_from_config
+from common.ply_stream import read_label_points, DEFAULT_CHUNK
+from common.ply_writer import write_ply
+from common.packed_clusters import write_packed_clusters, remove_packed_clusters
 from extractor.interface import detect_poles
 
 # =========================================================
@@ -34,16 +39,29 @@ def load_config(path=CONFIG_FILE):
 # =========================================================
 # SAVE CLUSTERS
 # =========================================================
-def save_clusters(clusters, output_dir):
-    import open3d as o3d
+def save_clusters(clusters, output_dir, packed=False, workers=1, frame=None):
+    """
+    Saves the clusters either as one packed file (points + offsets)
+    or as one PLY per cluster, written by a thread pool.
+    Clusters in local coordinates are written back in global ones.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    for i, cluster_pts in enumerate(clusters):
+    to_global = frame.to_global if frame is not None else np.asarray
+    if packed:
+        return write_packed_clusters([to_global(c) for c in clusters], output_dir)
+
+    # A stale packed file would take precedence in the classifier
+    remove_packed_clusters(output_dir)
+
+    def write_one(item):
+        i, cluster_pts = item
         if len(cluster_pts) == 0:
-            continue
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(cluster_pts)
+            return
         ply_path = os.path.join(output_dir, f"pole_{i+1:02d}.ply")
-        o3d.io.write_point_cloud(ply_path, pcd)
+        write_ply(ply_path, to_global(cluster_pts), coord_dtype="f8")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(write_one, enumerate(clusters)))
 
 
 # =========================================================
@@ -53,22 +71,28 @@ def main():
     config = load_config()
     input_ply = config["input_ply"]
 
-    # Read PLY file
-    plydata = PlyData.read(input_ply)
-    vertex = plydata["vertex"].data
-    field_names = vertex.dtype.names
+    extractor_cfg = config.get("extractor", {})
 
-    # Detect label field
-    label_field = None
-    for candidate in ["scalar_Label", "label", "Label", "classification", "class"]:
-        if candidate in field_names:
-            label_field = candidate
-            break
-    if label_field is None:
-        raise ValueError("❌ No label field found in PLY.")
+    if extractor_cfg.get("streaming", False):
+        # Bounded memory: read the PLY in chunks, keep only MT points
+        points = read_label_points(
+            input_ply,
+            config["label_MT"],
+            chunk_size=extractor_cfg.get("chunk_points", DEFAULT_CHUNK)
+        )
+        # Same origin as the other stages (bounding box of the input)
+        frame = frame_from_config(config)
+        points = frame.to_local(points)
+        labels = np.full(len(points), config["label_MT"])
+    else:
+        # Map PLY file (shared with the other stages)
+        cloud = load_pointcloud(input_ply, cache_dir=config.get("cache_dir"))
+        if cloud.label_field is None:
+            raise ValueError("❌ No label field found in PLY.")
 
-    points = np.vstack([vertex["x"], vertex["y"], vertex["z"]]).T
-    labels = np.array(vertex[label_field])
+        # Only the MT points are materialized
+        frame = frame_from_config(config, cloud=cloud)
+        points, labels = cloud.select(include=[config["label_MT"]], frame=frame)
 
     # ============================
     # Call the interface
@@ -76,11 +100,18 @@ def main():
     clusters = detect_poles(
         points,
         labels,
-        method="dbscan",
-        target_label=config["label_MT"]
+        method=extractor_cfg.get("method", "dbscan"),
+        target_label=config["label_MT"],
+        config=config
     )
 
-    save_clusters(clusters, config["models_dir"])
+    save_clusters(
+        clusters,
+        config["models_dir"],
+        packed=extractor_cfg.get("output_format", "ply") == "packed",
+        workers=extractor_cfg.get("write_workers", 1),
+        frame=frame
+    )
     print(f"✅ Total clusters detected: {len(clusters)}")
     print(f"📂 Saved in: {config['models_dir']}")
 
@@ -0,0 +1,189 @@
+"""
+=========================================================
+Extractor benchmark:
+Runs every registered clustering method on the same MT
+points and reports runtime, peak memory, cluster count and
+agreement (adjusted Rand index) with a reference method.
+
+Each method runs in its own subprocess, so the peak RSS of
+one method does not hide the others. Parameters come from
+config.json (extractor.<method>).
+
+Usage:
+    python -m extractor.benchmark                       # input_ply of config.json
+    python -m extractor.benchmark --synthetic 500       # synthetic poles
+    python -m extractor.benchmark --methods voxel_cc tiled_dbscan --reference dbscan
+=========================================================
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from extractor.interface import available_methods
+from extractor.registry import get_method
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+
+
+# =========================================================
+# INPUTS AND METRICS
+# =========================================================
+def synthetic_poles(n_poles, per_pole, noise=0.02, spacing=40.0, seed=0):
+    """
+    Vertical pole columns on a jittered line plus isolated noise points.
+    """
+    rng = np.random.default_rng(seed)
+    cx = np.arange(n_poles) * spacing + rng.normal(0.0, 3.0, n_poles)
+    cy = rng.normal(0.0, 5.0, n_poles)
+    pid = np.repeat(np.arange(n_poles), per_pole)
+    pts = np.column_stack([
+        cx[pid] + rng.normal(0.0, 0.15, len(pid)),
+        cy[pid] + rng.normal(0.0, 0.15, len(pid)),
+        rng.random(len(pid)) * 12.0,
+    ])
+    n_noise = int(len(pts) * noise)
+    extent = n_poles * spacing
+    noise_pts = np.column_stack([
+        rng.random(n_noise) * extent,
+        rng.normal(0.0, 30.0, n_noise),
+        rng.random(n_noise) * 12.0,
+    ])
+    return np.vstack([pts, noise_pts])
+
+
+def load_mt_points(config):
+    """
+    MT points of config.json input_ply, in the local frame of the run.
+    """
+    from common.pointcloud import load_pointcloud
+    from common.coords import frame_from_config
+
+    cloud = load_pointcloud(config["input_ply"], cache_dir=config.get("cache_dir"))
+    frame = frame_from_config(config, cloud=cloud)
+    points, _ = cloud.select(include=[config["label_MT"]], frame=frame)
+    return points
+
+
+def adjusted_rand_index(a, b):
+    """
+    Adjusted Rand index of two labelings of the same points.
+    """
+    _, a = np.unique(a, return_inverse=True)
+    _, b = np.unique(b, return_inverse=True)
+    a, b = a.ravel(), b.ravel()
+    table = coo_matrix((np.ones(len(a)), (a, b))).tocsr()
+    comb2 = lambda x: (x * (x - 1) / 2.0).sum()
+    sum_ij = comb2(table.data)
+    sum_a = comb2(np.asarray(table.sum(axis=1)).ravel())
+    sum_b = comb2(np.asarray(table.sum(axis=0)).ravel())
+    expected = sum_a * sum_b / comb2(np.array([float(len(a))]))
+    maximum = (sum_a + sum_b) / 2.0
+    return 1.0 if maximum == expected else (sum_ij - expected) / (maximum - expected)
+
+
+# =========================================================
+# CHILD PROCESS (one method)
+# =========================================================
+def run_child(method, points_path, labels_path, config):
+    points = np.load(points_path)
+    rss_loaded = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    labels = np.asarray(get_method(method).labels(points, config))
+    elapsed = time.perf_counter() - t0
+
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    np.save(labels_path, labels.astype(np.int64))
+    # ru_maxrss is in KiB on Linux
+    print(json.dumps({
+        "time_s": elapsed,
+        "peak_rss_mb": rss_peak / 1024.0,
+        "method_rss_mb": (rss_peak - rss_loaded) / 1024.0,
+    }))
+
+
+def run_method(method, points_path, work_dir):
+    """
+    Runs one method in a subprocess. Returns (stats dict, labels) or (error, None).
+    """
+    labels_path = os.path.join(work_dir, f"{method}_labels.npy")
+    proc = subprocess.run(
+        [sys.executable, "-m", "extractor.benchmark", "--child", method,
+         "--points", points_path, "--labels", labels_path],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {proc.returncode}"}, None
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    return stats, np.load(labels_path)
+
+
+# =========================================================
+# MAIN
+# =========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Compare the extractor clustering methods")
+    parser.add_argument("--methods", nargs="+", help="Methods to run (default: all registered)")
+    parser.add_argument("--reference", default="dbscan", help="Method used as ground truth")
+    parser.add_argument("--synthetic", type=int, help="Use N synthetic poles instead of input_ply")
+    parser.add_argument("--points-per-pole", type=int, default=1000)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--points", help=argparse.SUPPRESS)
+    parser.add_argument("--labels", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+
+    if args.child:
+        run_child(args.child, args.points, args.labels, config)
+        return
+
+    methods = args.methods or available_methods()
+    for name in methods + [args.reference]:
+        get_method(name)
+    if args.reference not in methods:
+        methods = [args.reference] + methods
+
+    if args.synthetic:
+        points = synthetic_poles(args.synthetic, args.points_per_pole)
+    else:
+        points = load_mt_points(config)
+    print(f"📊 {len(points)} MT points | reference: {args.reference}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        points_path = os.path.join(work_dir, "points.npy")
+        np.save(points_path, np.ascontiguousarray(points, dtype=np.float64))
+        del points
+
+        results = {}
+        for name in methods:
+            print(f"⏱️ {name} ...")
+            results[name] = run_method(name, points_path, work_dir)
+
+    ref_labels = results[args.reference][1]
+    print(f"{'method':<16}{'time [s]':>10}{'peak [MB]':>11}{'method [MB]':>13}"
+          f"{'clusters':>10}{'ARI':>8}")
+    for name in methods:
+        stats, labels = results[name]
+        if labels is None:
+            print(f"{name:<16}  ❌ {stats['error']}")
+            continue
+        ari = adjusted_rand_index(ref_labels, labels) if ref_labels is not None else float("nan")
+        print(f"{name:<16}{stats['time_s']:>10.3f}{stats['peak_rss_mb']:>11.1f}"
+              f"{stats['method_rss_mb']:>13.1f}{int(labels.max(initial=-1)) + 1:>10}{ari:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
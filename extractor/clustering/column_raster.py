@@ -0,0 +1,110 @@
+"""
+Column-raster method for MT pole clustering.
+Poles are nearly vertical, so in XY they are dense, tall columns.
+Target points are rasterized onto an XY grid in one linear pass
+(per-cell count with np.bincount, z-min / z-max with
+np.minimum.at / np.maximum.at). Cells that pass the height and
+density thresholds are pole candidates; the densest candidate
+within `peak_separation` m is kept as a peak (non-maximum
+suppression). Every occupied cell is then assigned to its nearest
+peak within `radius` m, and points take the peak of their cell.
+
+No per-point neighbour search: memory is a few arrays per point
+plus the occupied cells, suitable for hundreds of millions of
+points.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from common.cluster_labels import renumber_labels
+from extractor.registry import register_method, detect_with
+
+# Default parameters
+CELL_SIZE = 0.5
+MIN_HEIGHT = 3.0
+MIN_CELL_POINTS = 10
+PEAK_SEPARATION = 2.0
+RADIUS = 2.5
+MIN_POINTS_CLUSTER = 20
+MAX_DENSE_CELLS = 50_000_000  # larger grids are compacted to the occupied cells
+
+def rasterize_columns(points, cell_size):
+    """
+    Per-cell statistics of the XY raster.
+    Returns:
+        cell (N,) cell index of each point, centers (M,2), count, zmin, zmax (M,)
+    """
+    origin = points[:, :2].min(axis=0)
+    ij = np.floor((points[:, :2] - origin) / cell_size).astype(np.int64)
+    ny = int(ij[:, 1].max()) + 1
+    keys = ij[:, 0] * ny + ij[:, 1]
+
+    if (int(ij[:, 0].max()) + 1) * ny <= MAX_DENSE_CELLS:
+        count = np.bincount(keys)
+        occupied = np.flatnonzero(count)
+        # Dense key -> compact occupied cell
+        compact = np.zeros(len(count), dtype=np.int64)
+        compact[occupied] = np.arange(len(occupied))
+        cell, count, cell_keys = compact[keys], count[occupied], occupied
+    else:
+        cell_keys, cell = np.unique(keys, return_inverse=True)
+        cell = cell.ravel()
+        count = np.bincount(cell)
+
+    zmin = np.full(len(cell_keys), np.inf)
+    zmax = np.full(len(cell_keys), -np.inf)
+    np.minimum.at(zmin, cell, points[:, 2])
+    np.maximum.at(zmax, cell, points[:, 2])
+
+    centers = origin + (np.column_stack([cell_keys // ny, cell_keys % ny]) + 0.5) * cell_size
+    return cell, centers, count, zmin, zmax
+
+
+@register_method(
+    "column_raster", cell_size=CELL_SIZE, min_height=MIN_HEIGHT,
+    min_cell_points=MIN_CELL_POINTS, peak_separation=PEAK_SEPARATION,
+    radius=RADIUS, min_points=MIN_POINTS_CLUSTER
+)
+def column_raster_labels(points, cell_size=CELL_SIZE, min_height=MIN_HEIGHT,
+                         min_cell_points=MIN_CELL_POINTS, peak_separation=PEAK_SEPARATION,
+                         radius=RADIUS, min_points=MIN_POINTS_CLUSTER):
+    """
+    Column peak label of every point (-1 = noise).
+    """
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    cell, centers, count, zmin, zmax = rasterize_columns(points, cell_size)
+
+    # Tall and dense columns, densest first
+    cand = np.flatnonzero((count >= min_cell_points) & (zmax - zmin >= min_height))
+    if len(cand) == 0:
+        return np.full(n, -1, dtype=np.int64)
+    cand = cand[np.argsort(-count[cand], kind="stable")]
+
+    # Non-maximum suppression among the (few) candidate cells
+    tree = cKDTree(centers[cand])
+    suppressed = np.zeros(len(cand), dtype=bool)
+    peaks = []
+    for k in range(len(cand)):
+        if suppressed[k]:
+            continue
+        peaks.append(cand[k])
+        suppressed[tree.query_ball_point(centers[cand[k]], peak_separation)] = True
+
+    # Occupied cells -> nearest peak within radius -> points
+    dist, nearest = cKDTree(centers[peaks]).query(centers, distance_upper_bound=radius)
+    cell_peak = np.where(np.isfinite(dist), nearest, -1)
+    comp = cell_peak[cell]
+
+    sizes = np.bincount(comp[comp >= 0], minlength=len(peaks))
+    comp[(comp >= 0) & (sizes[np.maximum(comp, 0)] < min_points)] = -1
+    return renumber_labels(comp)
+
+def detect_with_column_raster(points, labels, target_label=7, **kwargs):
+    """
+    Detects pole clusters as tall, dense columns of an XY raster.
+    """
+    return detect_with("column_raster", points, labels, target_label=target_label, **kwargs)
@@ -4,36 +4,32 @@ Completely internal: black box.
 """
 
 import numpy as np
-import open3d as o3d
+
+from extractor.registry import register_method, detect_with
 
 # Default DBSCAN parameters
 EPS_CLUSTER = 2.0
 MIN_POINTS_CLUSTER = 20
 
-def detect_with_dbscan(points, labels, target_label=7):
+@register_method("dbscan", eps=EPS_CLUSTER, min_points=MIN_POINTS_CLUSTER)
+def dbscan_labels(points, eps=EPS_CLUSTER, min_points=MIN_POINTS_CLUSTER):
     """
-    Detects pole clusters using DBSCAN.
+    Open3D DBSCAN label of every point (-1 = noise).
     """
-    # Filter points with the desired label
-    mask = labels == target_label
-    poles_points = points[mask]
-
-    if len(poles_points) == 0:
-        return []
+    # Imported here so the other methods work without Open3D
+    import open3d as o3d
 
     # Create point cloud
     pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(poles_points)
+    pcd.points = o3d.utility.Vector3dVector(points)
 
     # Apply DBSCAN
-    cluster_labels = np.array(
-        pcd.cluster_dbscan(eps=EPS_CLUSTER, min_points=MIN_POINTS_CLUSTER, print_progress=False)
+    return np.array(
+        pcd.cluster_dbscan(eps=eps, min_points=min_points, print_progress=False)
     )
 
-    clusters = []
-    num_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-    for cid in range(num_clusters):
-        mask_cluster = cluster_labels == cid
-        clusters.append(poles_points[mask_cluster])
-
-    return clusters
\ No newline at end of file
+def detect_with_dbscan(points, labels, target_label=7, **kwargs):
+    """
+    Detects pole clusters using DBSCAN.
+    """
+    return detect_with("dbscan", points, labels, target_label=target_label, **kwargs)
@@ -0,0 +1,184 @@
+"""
+Tiled parallel DBSCAN for MT pole clustering.
+MT points are split into XY tiles of `tile_size` m. Each tile is
+clustered in a process pool together with a halo of 2*eps, so the
+core status of every point within eps of the tile is exact. Local
+clusters that share a core point are then merged over all tiles
+(union of a graph of local cluster ids), which gives the same core
+clusters as a single global DBSCAN over every point.
+
+Core points use the Open3D convention (the point counts itself).
+Border points join the cluster of their nearest core point within
+eps; global DBSCAN resolves those ties by visit order instead.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from common.shared_arrays import SharedArrays, attach_shared
+from common.cluster_labels import renumber_labels
+from common.workers import resolve_workers
+from extractor.registry import register_method, detect_with
+
+# Default parameters (same as DBSCAN)
+EPS_CLUSTER = 2.0
+MIN_POINTS_CLUSTER = 20
+TILE_SIZE = 200.0
+MARGIN = 1e-6  # halo slack against rounding at tile borders
+
+_WORKER = {}
+
+
+def _tile_members(points_xy, tile_size, halo):
+    """
+    (tile keys, point indices) of every tile a point belongs to, halo included.
+    Returns:
+        list of ((ix, iy), indices) sorted by tile
+    """
+    ij = np.floor(points_xy / tile_size).astype(np.int64)
+    frac = points_xy - ij * tile_size
+    near = {-1: frac < halo, 0: np.ones(ij.shape, dtype=bool), 1: frac > tile_size - halo}
+
+    tiles, members = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            idx = np.flatnonzero(near[dx][:, 0] & near[dy][:, 1])
+            tiles.append(ij[idx] + (dx, dy))
+            members.append(idx)
+    tiles = np.vstack(tiles)
+    members = np.concatenate(members)
+
+    keys, inverse = np.unique(tiles, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+    return list(zip(map(tuple, keys), np.split(members[order], bounds)))
+
+
+def _cluster_tile(points, idx, tile, tile_size, eps, min_points):
+    """
+    DBSCAN of one tile (+ 2*eps halo).
+    Returns:
+        core_idx, core_lbl: cores within eps of the tile and their local cluster
+        border_idx, border_lbl: non-core points owned by the tile with a cluster
+        n_local: number of local clusters
+    """
+    pts = points[idx]
+    lo = np.asarray(tile, dtype=np.float64) * tile_size
+    xy = pts[:, :2]
+    owned = np.all(np.floor(xy / tile_size) == tile, axis=1)
+    # Points within eps of the tile: their neighbours all lie in the tile + 2*eps
+    band = np.all((xy >= lo - eps - MARGIN) & (xy < lo + tile_size + eps + MARGIN), axis=1)
+
+    tree = cKDTree(pts)
+    band_idx = np.flatnonzero(band)
+    counts = tree.query_ball_point(pts[band_idx], eps, return_length=True)
+    core = band_idx[counts >= min_points]
+    if len(core) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty, 0
+
+    core_tree = cKDTree(pts[core])
+    pairs = core_tree.query_pairs(eps, output_type="ndarray")
+    graph = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+        shape=(len(core), len(core))
+    )
+    n_local, core_lbl = connected_components(graph, directed=False)
+
+    is_core = np.zeros(len(pts), dtype=bool)
+    is_core[core] = True
+    border = np.flatnonzero(owned & ~is_core)
+    dist, nearest = core_tree.query(pts[border], distance_upper_bound=eps)
+    hit = np.isfinite(dist)
+
+    return idx[core], core_lbl, idx[border[hit]], core_lbl[nearest[hit]], n_local
+
+
+def _init_worker(spec, meta):
+    arrays, blocks = attach_shared(spec)
+    _WORKER["blocks"] = blocks
+    _WORKER["points"] = arrays["points"]
+    _WORKER.update(meta)
+
+
+def _cluster_task(item):
+    tile, idx = item
+    return _cluster_tile(
+        _WORKER["points"], idx, tile, _WORKER["tile_size"], _WORKER["eps"], _WORKER["min_points"]
+    )
+
+
+@register_method(
+    "tiled_dbscan", eps=EPS_CLUSTER, min_points=MIN_POINTS_CLUSTER, tile_size=TILE_SIZE, workers=1
+)
+def tiled_dbscan_labels(points, eps=EPS_CLUSTER, min_points=MIN_POINTS_CLUSTER,
+                        tile_size=TILE_SIZE, workers=1):
+    """
+    DBSCAN labels (-1 = noise, clusters numbered by first appearance)
+    computed tile by tile.
+
+    Args:
+        points: (N,3)
+        tile_size: XY tile edge in metres (at least 2*eps)
+        workers: processes (values <= 0 mean all cores, 1 runs in-process)
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    tile_size = max(float(tile_size), 2.0 * eps)
+    workers = resolve_workers(workers)
+
+    # Tiles that own no point only add halo work
+    owners = set(map(tuple, np.unique(np.floor(points[:, :2] / tile_size).astype(np.int64), axis=0)))
+    items = [
+        (tile, idx) for tile, idx in _tile_members(points[:, :2], tile_size, 2.0 * eps + MARGIN)
+        if tile in owners
+    ]
+
+    if workers == 1 or len(items) == 1:
+        results = [_cluster_tile(points, idx, tile, tile_size, eps, min_points) for tile, idx in items]
+    else:
+        meta = {"tile_size": tile_size, "eps": eps, "min_points": min_points}
+        with SharedArrays({"points": points}) as shared:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(shared.spec, meta)
+            ) as pool:
+                results = list(pool.map(_cluster_task, items))
+
+    # Global ids of the local clusters
+    offsets = np.cumsum([0] + [r[4] for r in results])
+    if offsets[-1] == 0:
+        return np.full(n, -1, dtype=np.int64)
+    core_idx = np.concatenate([r[0] for r in results])
+    core_node = np.concatenate([r[1] + o for r, o in zip(results, offsets)])
+    border_idx = np.concatenate([r[2] for r in results])
+    border_node = np.concatenate([r[3] + o for r, o in zip(results, offsets)])
+
+    # A core point seen by several tiles links their local clusters
+    order = np.argsort(core_idx, kind="stable")
+    core_idx, core_node = core_idx[order], core_node[order]
+    same = core_idx[1:] == core_idx[:-1]
+    graph = coo_matrix(
+        (np.ones(same.sum(), dtype=np.int8), (core_node[:-1][same], core_node[1:][same])),
+        shape=(offsets[-1], offsets[-1])
+    )
+    _, node_comp = connected_components(graph, directed=False)
+
+    comp = np.full(n, -1, dtype=np.int64)
+    comp[core_idx] = node_comp[core_node]
+    comp[border_idx] = node_comp[border_node]
+
+    # Renumber by first appearance, so labels do not depend on the tiling
+    return renumber_labels(comp)
+
+
+def detect_with_tiled_dbscan(points, labels, target_label=7, **kwargs):
+    """
+    Detects pole clusters with DBSCAN run per XY tile in a process pool.
+    """
+    return detect_with("tiled_dbscan", points, labels, target_label=target_label, **kwargs)
@@ -0,0 +1,30 @@
+"""
+Voxel connected-components method for MT pole clustering.
+Points are hashed into eps-sized voxels and touching occupied
+voxels (26-neighbourhood) form one cluster: a linear-time
+alternative to DBSCAN without per-point neighbour lists.
+
+Two points closer than eps always fall in touching voxels, so
+every DBSCAN cluster is contained in one voxel component; the
+voxel method can only merge clusters DBSCAN keeps apart.
+"""
+
+from common.voxel_components import voxel_components
+from extractor.registry import register_method, detect_with
+
+# Default parameters (same scale as DBSCAN)
+VOXEL_SIZE = 2.0
+MIN_POINTS_CLUSTER = 20
+
+@register_method("voxel_cc", voxel_size=VOXEL_SIZE, min_points=MIN_POINTS_CLUSTER)
+def voxel_cc_labels(points, voxel_size=VOXEL_SIZE, min_points=MIN_POINTS_CLUSTER):
+    """
+    Voxel component label of every point (-1 = noise).
+    """
+    return voxel_components(points, voxel_size, min_points=min_points)
+
+def detect_with_voxel_cc(points, labels, target_label=7, **kwargs):
+    """
+    Detects pole clusters as connected components of occupied voxels.
+    """
+    return detect_with("voxel_cc", points, labels, target_label=target_label, **kwargs)
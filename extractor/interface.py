@@ -1,22 +1,22 @@
 """
 Unified interface for detecting MT poles
 Connects input/output with internal clustering methods.
+Methods register themselves in extractor.registry when imported.
 """
 
-from .clustering.dbscan import detect_with_dbscan
+from .registry import detect_with, available_methods
+from .clustering import dbscan, tiled_dbscan, voxel_cc, column_raster  # noqa: F401 (registration)
 
-def detect_poles(points, labels, method="dbscan", target_label=7, **kwargs):
+def detect_poles(points, labels, method="dbscan", target_label=7, config=None, **kwargs):
     """
     Args:
         points: np.array (Nx3)
         labels: np.array (N)
-        method: str, "dbscan" or another
+        method: str, one of available_methods()
         target_label: MT pole label
-        kwargs: additional parameters for each method
+        config: config.json dict, method parameters are read from extractor.<method>
+        kwargs: parameter overrides for the method
     Returns:
         list of clusters (each one an np.array Nx3)
     """
-    if method == "dbscan":
-        return detect_with_dbscan(points, labels, target_label=target_label, **kwargs)
-    else:
-        raise ValueError(f"Unsupported method: {method}")
\ No newline at end of file
+    return detect_with(method, points, labels, target_label=target_label, config=config, **kwargs)
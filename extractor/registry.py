@@ -0,0 +1,89 @@
+"""
+Registry of MT pole clustering methods.
+Each method registers a labelling function (points -> cluster
+label per point, -1 = noise) together with its parameter
+schema: parameter names and defaults. Values come from
+config.json (extractor.<method>) and can be overridden per call.
+"""
+
+import numpy as np
+
+_METHODS = {}
+
+
+class Method:
+    """
+    A registered clustering method.
+    """
+
+    def __init__(self, name, labels_fn, defaults):
+        self.name = name
+        self.labels_fn = labels_fn
+        self.defaults = dict(defaults)
+
+    def params(self, config=None, **overrides):
+        """
+        Defaults <- config.json extractor.<name> <- overrides, checked against
+        the schema and cast to the type of each default.
+        """
+        values = dict(self.defaults)
+        section = (config or {}).get("extractor", {}).get(self.name, {})
+        for source in (section, overrides):
+            unknown = set(source) - set(self.defaults)
+            if unknown:
+                raise ValueError(
+                    f"❌ Unknown parameters for method {self.name}: {sorted(unknown)} "
+                    f"(expected {sorted(self.defaults)})"
+                )
+            values.update(source)
+        return {k: type(self.defaults[k])(v) for k, v in values.items()}
+
+    def labels(self, points, config=None, **overrides):
+        return self.labels_fn(points, **self.params(config, **overrides))
+
+
+def register_method(name, **defaults):
+    """
+    Decorator: registers `fn(points, **params) -> labels` as method `name`.
+    """
+    def decorator(fn):
+        _METHODS[name] = Method(name, fn, defaults)
+        return fn
+    return decorator
+
+
+def get_method(name):
+    if name not in _METHODS:
+        raise ValueError(f"Unsupported method: {name} (available: {available_methods()})")
+    return _METHODS[name]
+
+
+def available_methods():
+    return sorted(_METHODS)
+
+
+def clusters_from_labels(points, cluster_labels):
+    """
+    List of (Nx3) clusters ordered by label, noise (-1) dropped.
+    """
+    kept = np.flatnonzero(cluster_labels >= 0)
+    if len(kept) == 0:
+        return []
+    order = kept[np.argsort(cluster_labels[kept], kind="stable")]
+    sizes = np.bincount(cluster_labels[kept])
+    return [c for c in np.split(points[order], np.cumsum(sizes)[:-1]) if len(c)]
+
+
+def detect_with(name, points, labels, target_label=7, config=None, **kwargs):
+    """
+    Filters the target label and clusters it with method `name`.
+    """
+    # Filter points with the desired label
+    mask = labels == target_label
+    poles_points = points[mask]
+
+    if len(poles_points) == 0:
+        return []
+
+    cluster_labels = np.asarray(get_method(name).labels(poles_points, config, **kwargs))
+    return clusters_from_labels(poles_points, cluster_labels)
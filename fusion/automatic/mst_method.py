@@ -4,9 +4,11 @@ from scipy.spatial import distance_matrix
 from fusion.utils.visualization import plot_connections
 
 
-def run_mst_method(df, k_neighbors=2):
+def run_mst_method(df, k_neighbors=2, frame=None):
     coords = df[["Center_X", "Center_Y"]].values
-    dist_matrix = distance_matrix(coords, coords)
+    # Distances in working coordinates (float32 in local mode)
+    local = frame.to_local(coords) if frame is not None else coords
+    dist_matrix = distance_matrix(local, local)
 
     edges = []
     for i in range(len(df)):
@@ -1,6 +1,7 @@
 import argparse
 import json
 from fusion.interface import run_fusion
+from common.coords import frame_from_config
 
 
 def load_config(path="config.json"):
@@ -34,7 +35,8 @@ def main():
     run_fusion(
         mode=args.mode,
         input_csv=f"{config['output_dir']}/poles_MT_info_classified.csv",
-        output_dir=config["output_dir"]
+        output_dir=config["output_dir"],
+        frame=frame_from_config(config)
     )
 
 
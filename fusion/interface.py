@@ -4,11 +4,11 @@ from fusion.automatic.mst_method import run_mst_method
 from fusion.manual.interactive_tool import run_interactive_tool
 
 
-def run_fusion(mode, input_csv, output_dir):
+def run_fusion(mode, input_csv, output_dir, frame=None):
     df = load_poles_csv(input_csv)
 
     if mode == "automatic":
-        connections, fig = run_mst_method(df)
+        connections, fig = run_mst_method(df, frame=frame)
 
         json_path = export_connections_json(connections, df, output_dir)
         img_path = save_figure(fig, output_dir)
@@ -2,6 +2,8 @@ import json
 import os
 import pandas as pd
 
+from common.pole_table import PoleTable
+
 
 def load_poles_csv(csv_path):
     if not os.path.exists(csv_path):
@@ -13,8 +15,10 @@ def export_connections_json(connections, df, output_dir):
     """
     Exports connections to JSON.
     `connections` must be a list of dictionaries.
+    `df` is the poles DataFrame or a PoleTable.
     """
 
+    poles = df if isinstance(df, PoleTable) else PoleTable.from_dataframe(df)
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, "connections.json")
 
@@ -25,8 +29,8 @@ def export_connections_json(connections, df, output_dir):
             "from_id": conn["from_id"],
             "to_id": conn["to_id"],
             "distance": conn["distance"],
-            "from_pole": df[df["Pole_ID"] == conn["from_id"]].iloc[0].to_dict(),
-            "to_pole": df[df["Pole_ID"] == conn["to_id"]].iloc[0].to_dict()
+            "from_pole": poles.record(conn["from_id"]),
+            "to_pole": poles.record(conn["to_id"])
         })
 
     with open(output_path, "w", encoding="utf-8") as f:
@@ -11,7 +11,7 @@ parser = argparse.ArgumentParser(description="Run full dms-Detection pipeline")
 parser.add_argument("--mode", choices=["automatic", "manual"], default="automatic",
                     help="Fusion mode: automatic or manual")
 parser.add_argument("--radius", type=float, help="Tube radius in meters")
-parser.add_argument("-i", "--input", type=str, help="Input PLY file (labeled)")
+parser.add_argument("-i", "--input", type=str, help="Input PLY or LAS file (labeled)")
 parser.add_argument("-o", "--output", type=str, help="Output folder")
 args = parser.parse_args()
 
@@ -28,6 +28,7 @@ if args.output:
     config["output_dir"] = args.output
     config["models_dir"] = os.path.join(config["output_dir"], "poles_MT")
     config["collisions_dir"] = os.path.join(config["output_dir"], "collisions")
+    config["cache_dir"] = os.path.join(config["output_dir"], "cache")
 if args.radius:
     config["tube"]["default_radius"] = args.radius
 
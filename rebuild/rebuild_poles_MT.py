@@ -1,9 +1,10 @@
 import open3d as o3d
 import numpy as np
-import pandas as pd
 import json
 import os
-from plyfile import PlyData
+
+from common.pointcloud import load_pointcloud
+from common.pole_table import load_pole_table
 
 # =========================
 # ⚙️ LOAD CONFIG
@@ -16,6 +17,7 @@ with open(CONFIG_PATH, "r") as f:
 
 PLY_PATH = os.path.join(BASE_DIR, config["input_ply"])
 CSV_PATH = os.path.join(BASE_DIR, config["csv_poles_MT"])
+CACHE_DIR = os.path.join(BASE_DIR, config["cache_dir"]) if config.get("cache_dir") else None
 OUTPUT_IMAGE = os.path.join(BASE_DIR, config["visualization"]["reconstruction"])
 
 # =========================
@@ -41,9 +43,7 @@ REMOVE_CLASSES = [0, config["label_MT"], 9]
 
 # Avarage height
 def compute_average_pole_height(csv_path):
-    df = pd.read_csv(csv_path)
-    heights = df["Height_m"].dropna()
-    avg_height = heights.mean()
+    avg_height = load_pole_table(csv_path).mean_height()
     print(f"📏 Using average pole height: {avg_height:.2f} m")
     return avg_height
 
@@ -124,19 +124,50 @@ def create_bipole_with_transformer(x, y, z_base, height):
     geometries.append(transformer)
     return geometries
 
+# =========================
+# 📐 POLE PARTS (analytic)
+# =========================
+def pole_parts(x, y, z_base, height, pole_type):
+    """
+    Primitive parts of a reconstructed pole, matching the meshes above:
+    ("cylinder", p1, p2, radius) and ("box", min, max).
+    """
+    def single(px, py):
+        parts = [("cylinder", [px, py, z_base], [px, py, z_base + height], pole_radius)]
+        z_start = z_base + height - crossarm_radius
+        for i in range(num_crossarms):
+            z = z_start - i * crossarm_spacing
+            parts.append((
+                "cylinder",
+                [px + pole_radius, py, z],
+                [px + pole_radius + crossarm_length, py, z],
+                crossarm_radius
+            ))
+        return parts
+
+    t = pole_type.lower()
+    if t == "monoposte":
+        return single(x, y)
+    if t == "biposte":
+        box_min = [x - pole_radius, y - (bipole_spacing / 2 + pole_radius), z_base + height / 2]
+        box_max = [
+            box_min[0] + 2 * pole_radius,
+            box_min[1] + bipole_spacing + 2 * pole_radius,
+            box_min[2] + transformer_height
+        ]
+        return (
+            single(x, y - bipole_spacing / 2)
+            + single(x, y + bipole_spacing / 2)
+            + [("box", box_min, box_max)]
+        )
+    return []
+
 # =========================
 # 📥 LOAD POINT CLOUD
 # =========================
 def load_and_color_pointcloud():
-    plydata = PlyData.read(PLY_PATH)
-    v = plydata["vertex"].data
-
-    points = np.vstack([v["x"], v["y"], v["z"]]).T
-    labels = v["class"]
-
-    mask = ~np.isin(labels, REMOVE_CLASSES)
-    points = points[mask]
-    labels = labels[mask]
+    cloud = load_pointcloud(PLY_PATH, cache_dir=CACHE_DIR)
+    points, labels = cloud.select(exclude=REMOVE_CLASSES)
 
     colors = np.zeros((len(labels), 3))
     for cls, rgb in COLOR_MAP.items():
@@ -176,14 +207,11 @@ def run_rebuild():
 # 🏗️ RECONSTRUCT POLES
 # =========================
 def reconstruct_poles(uniform_height):
-    df = pd.read_csv(CSV_PATH)
+    poles = load_pole_table(CSV_PATH)
     geometries = []
 
-    for _, row in df.iterrows():
-        x = row["Center_X"]
-        y = row["Center_Y"]
-        z = row["Base_Z"]
-        t = row["Type"].lower()
+    for x, y, z, t in zip(poles["Center_X"], poles["Center_Y"], poles["Base_Z"], poles["Type"]):
+        t = t.lower()
 
         if t == "monoposte":
             geometries += create_pole_with_crossarms(
@@ -194,7 +222,7 @@ def reconstruct_poles(uniform_height):
                 x, y, z, uniform_height
             )
 
-    print(f"✅ Reconstructed {len(df)} poles with uniform height")
+    print(f"✅ Reconstructed {len(poles)} poles with uniform height")
     return geometries
 
 # =========================